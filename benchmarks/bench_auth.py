@@ -0,0 +1,101 @@
+"""Load test concurrent registrations and logins against a local SQLite file.
+
+    python benchmarks/bench_auth.py --users 200 --concurrency 16 --rounds 10
+
+Registers --users accounts, then logs each one in (plus a share of wrong passwords),
+all from --concurrency threads, and reports throughput, latency percentiles and errors.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from auth import AuthService  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_phase(name, func, jobs, concurrency):
+    def timed(job):
+        start = time.perf_counter()
+        try:
+            result = func(*job)
+            error = None
+        except Exception as exc:
+            result, error = None, repr(exc)
+        return time.perf_counter() - start, result, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, jobs))
+    elapsed = time.perf_counter() - start
+    latencies = [latency for latency, _, _ in outcomes]
+    errors = [error for _, _, error in outcomes if error]
+    summary = {
+        "phase": name,
+        "ops": len(jobs),
+        "ops_per_s": round(len(jobs) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "errors": len(errors),
+    }
+    print(f"{name:<9} {summary['ops']} ops in {elapsed:.2f}s  {summary['ops_per_s']} ops/s  "
+          f"p50 {summary['p50_ms']} ms  p99 {summary['p99_ms']} ms  errors {summary['errors']}")
+    for error in sorted(set(errors))[:5]:
+        print(f"  {error}")
+    return summary, [result for _, result, _ in outcomes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost factor (the app defaults to 12)")
+    parser.add_argument("--workers", type=int, help="bcrypt worker threads (default BCRYPT_WORKERS)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        auth = AuthService(database_url=f"sqlite:///{os.path.join(workdir, 'users.db')}",
+                           bcrypt_rounds=args.rounds, hash_workers=args.workers, secret="bench")
+        users = [(f"user{i}@example.com", f"user{i}", f"password-{i}") for i in range(args.users)]
+        results = []
+
+        summary, registered = run_phase("register", auth.register, users, args.concurrency)
+        summary["accepted"] = sum(bool(ok) for ok in registered)
+        results.append(summary)
+
+        # Registering every account again must be rejected, not corrupt the table
+        summary, duplicates = run_phase("duplicate", auth.register, users, args.concurrency)
+        summary["accepted"] = sum(bool(ok) for ok in duplicates)
+        results.append(summary)
+
+        logins = [(email, password if i % 5 else "wrong") for i, (email, _, password) in enumerate(users)]
+        summary, tokens = run_phase("login", auth.login, logins, args.concurrency)
+        summary["accepted"] = sum(token is not None for token in tokens)
+        results.append(summary)
+
+        valid = [(token,) for token in tokens if token]
+        summary, _ = run_phase("token", auth.verify_token, valid * 10, args.concurrency)
+        results.append(summary)
+        auth.close()
+
+    expected_logins = sum(1 for i in range(args.users) if i % 5)
+    print(f"accepted: {results[0]['accepted']}/{args.users} registrations, {results[1]['accepted']} duplicates, "
+          f"{results[2]['accepted']}/{expected_logins} logins")
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Benchmark URL discovery against a local stub search engine serving saved result pages.
+
+    python benchmarks/bench_discovery.py --queries 8 --engines 3 --latency 200
+    python benchmarks/bench_discovery.py --backend browser      # needs Chrome and chromedriver
+
+Runs the same (engine, query) workload with one worker and with --workers, and checks the
+merged output file for duplicates.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from url_registry import load_sites  # noqa: E402
+from urls_finder import URLFinder  # noqa: E402
+
+RESULTS_PAGE = os.path.join(ROOT, "benchmarks", "fixtures", "search", "results.html")
+
+
+def start_stub_server(latency):
+    with open(RESULTS_PAGE, 'rb') as file:
+        body = file.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(engines, queries, backend, workers, output_path):
+    url_finder = URLFinder(engines=engines, backend=backend, workers=workers, output_path=output_path)
+    try:
+        start = time.perf_counter()
+        urls = url_finder.discover(queries)
+        elapsed = time.perf_counter() - start
+    finally:
+        url_finder.close()
+    return elapsed, urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=8)
+    parser.add_argument("--engines", type=int, default=3, help="stub engines, each under its own path")
+    parser.add_argument("--latency", type=int, default=200, help="stub response delay in ms")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--backend", choices=["http", "browser", "auto"], default="http")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.latency / 1000)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    engines = [f"{base}/engine{i}/search?q=" for i in range(args.engines)]
+    queries = [f"pakistani women lawn brands {i}" for i in range(args.queries)]
+    pages = len(engines) * len(queries)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in (1, args.workers):
+            output_path = os.path.join(workdir, f"discovered_{workers}.txt")
+            elapsed, urls = run(engines, queries, args.backend, workers, output_path)
+            # A second pass must not add anything to the file
+            run(engines, queries, args.backend, workers, output_path)
+            with open(output_path, 'r') as file:
+                lines = [line for line in file.read().splitlines() if line]
+            result = {
+                "workers": workers,
+                "pages": pages,
+                "seconds": round(elapsed, 3),
+                "pages_per_s": round(pages / elapsed, 1),
+                "sites": len(urls),
+                "file_lines": len(lines),
+                "file_unique": len(load_sites(output_path)),
+            }
+            results.append(result)
+            print(f"{args.backend} workers={workers:<3} {pages} pages in {elapsed:.2f}s  "
+                  f"{result['pages_per_s']} pages/s  {result['sites']} sites  "
+                  f"file {result['file_lines']} lines / {result['file_unique']} unique")
+    server.shutdown()
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
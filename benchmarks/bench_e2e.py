@@ -0,0 +1,215 @@
+"""Offline end-to-end benchmark of FashionBot against the local site farm.
+
+    python benchmarks/bench_e2e.py                          # 1x, 10x and 100x pages per urls.txt site
+    python benchmarks/bench_e2e.py --scales 1,10 --latency 50 --failure-rate 0.02 --json after.json
+    python benchmarks/bench_e2e.py --scales 1 --compare before.json
+
+Embeddings and the chat model are replaced by deterministic fakes (benchmarks/fakes.py), so the
+numbers measure the bot itself; --embed-delay adds a model server round trip per batch. Each
+scale runs in a fresh process with its own temporary vector store, caches and catalog, and reports
+throughput, per-stage busy time of the refresh pipeline, p50/p99 latency and peak RSS.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from site_farm import COLORS, FABRICS, ITEMS, SiteFarm, load_domains  # noqa: E402
+
+COMPARED_METRICS = ("seconds", "p50_ms", "p99_ms", "peak_rss_mb")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def latency_summary(latencies):
+    total = sum(latencies)
+    return {
+        "queries": len(latencies),
+        "seconds": round(total, 3),
+        "qps": round(len(latencies) / total, 1) if total else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def build_questions(domains, count, seed):
+    rng = random.Random(seed)
+    questions = []
+    for _ in range(count):
+        brand = rng.choice(domains).split(".")[0]
+        fabric, item, color = rng.choice(FABRICS), rng.choice(ITEMS), rng.choice(COLORS)
+        template = rng.choice(["{color} {fabric} {item} from {brand}", "show me {fabric} {item} under 5000",
+                               "does {brand} have a {color} {item}?"])
+        questions.append(template.format(brand=brand, fabric=fabric, item=item, color=color))
+    return questions
+
+
+def run_scale(urls, questions, token_delay, embed_delay, result_queue):
+    # Runs in a fresh process so peak RSS belongs to this scale alone
+    workdir = tempfile.mkdtemp(prefix="bench_e2e_")
+    os.chdir(workdir)
+    os.environ.update({
+        "VECTOR_STORE_DIR": os.path.join(workdir, "vector_store"),
+        "EMBED_CACHE_DIR": os.path.join(workdir, "embedding_cache"),
+        "HTTP_CACHE_DIR": os.path.join(workdir, "http_cache"),
+        "CATALOG_PATH": os.path.join(workdir, "catalog", "products.npz"),
+        "EMBEDDINGS_BACKEND": "ollama",
+        "GROQ_API_KEY": os.environ.get("GROQ_API_KEY") or "offline",
+        "DISABLE_BACKGROUND_JOBS": "1",
+    })
+    import logging
+
+    logging.basicConfig(level=logging.WARNING)
+    from fakes import FakeChatModel, HashingEmbeddings
+    from main import FashionBot
+
+    bot = FashionBot()
+    bot.embeddings.embeddings = HashingEmbeddings(batch_delay=embed_delay)
+    bot.llm = FakeChatModel(token_delay=token_delay)
+    stages = {}
+
+    # Fetching, parsing, splitting, embedding and index writes overlap in one streamed refresh
+    start = time.perf_counter()
+    asyncio.run(bot.scrape_data_from_urls(urls))
+    elapsed = time.perf_counter() - start
+    chunks = len(bot.index.active.bm25) if bot.index.active else 0
+    pipeline = bot.last_pipeline_stats
+    stages["refresh"] = {"pages": len(urls), "documents": pipeline["pages"], "failed": len(bot.failed_urls),
+                         "chunks": chunks, "seconds": round(elapsed, 3), "pages_per_s": round(len(urls) / elapsed, 1),
+                         "catalog_products": len(bot.catalog), "pipeline": pipeline["stages"],
+                         "dedup": bot.last_dedup_stats}
+
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        with bot.index.read() as index:
+            index.retriever.invoke(question)
+        latencies.append(time.perf_counter() - start)
+    stages["retrieval"] = latency_summary(latencies)
+
+    latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        bot.get_response(question)
+        latencies.append(time.perf_counter() - start)
+    stages["get_response"] = latency_summary(latencies)
+    stages["get_response"]["cache"] = bot.response_cache.stats()
+
+    bot.extractor.shutdown()
+    bot.url_registry.stop()
+    result_queue.put({
+        "stages": stages,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "peak_child_rss_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+    })
+    os.chdir(ROOT)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(previous, current):
+    before = {result["scale"]: result for result in previous["results"]}
+    print(f"\ncompared with {previous.get('commit', '?')[:10]}:")
+    for result in current["results"]:
+        old = before.get(result["scale"])
+        if old is None:
+            continue
+        rows = [("total", "peak_rss_mb", old.get("peak_rss_mb"), result.get("peak_rss_mb"))]
+        if "refresh" not in old["stages"] and "scrape" in old["stages"]:
+            # Runs from before the streamed refresh scraped and indexed one after the other
+            old["stages"]["refresh"] = {"seconds": old["stages"]["scrape"]["seconds"]
+                                        + old["stages"]["prepare_vector_store"]["seconds"]}
+        for stage, metrics in result["stages"].items():
+            for metric in COMPARED_METRICS:
+                if metric in metrics:
+                    rows.append((stage, metric, old["stages"].get(stage, {}).get(metric), metrics[metric]))
+        for stage, metric, was, now in rows:
+            if was:
+                print(f"  {result['scale']:>3}x {stage:<22} {metric:<12} {was:>10} -> {now:>10}  "
+                      f"{(now - was) / was * 100:+.1f}%")
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10,100", help="pages per site, comma separated")
+    parser.add_argument("--sites", type=int, help="only the first N domains of urls.txt")
+    parser.add_argument("--latency", type=float, default=20, help="mean site response delay in ms")
+    parser.add_argument("--jitter", type=float, default=10, help="standard deviation of the delay in ms")
+    parser.add_argument("--failure-rate", type=float, default=0.01, help="share of requests answered with 503")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--token-delay", type=float, default=0, help="fake LLM delay per token in ms")
+    parser.add_argument("--embed-delay", type=float, default=0, help="fake embedder delay per batch in ms")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="earlier --json output to diff against")
+    args = parser.parse_args()
+
+    domains = load_domains(args.sites)
+    questions = build_questions(domains, args.queries, seed=7)
+    report = {"commit": git_commit(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "args": vars(args),
+              "results": []}
+    context = multiprocessing.get_context("spawn")
+
+    for scale in (int(value) for value in args.scales.split(",")):
+        farm = SiteFarm(domains, pages_per_site=scale, latency=args.latency / 1000, jitter=args.jitter / 1000,
+                        failure_rate=args.failure_rate)
+        urls = farm.start_in_thread()
+        result_queue = context.Queue()
+        process = context.Process(target=run_scale, args=(urls, questions, args.token_delay / 1000,
+                                                          args.embed_delay / 1000, result_queue))
+        process.start()
+        result = result_queue.get()
+        process.join()
+        farm.stop()
+
+        result = {"scale": scale, "sites": len(domains), **result,
+                  "farm": {"requests": farm.requests, "injected_failures": farm.failures}}
+        report["results"].append(result)
+        stages = result["stages"]
+        refresh = stages["refresh"]
+        print(f"{scale:>3}x  {refresh['pages']} pages")
+        print(f"      refresh   {refresh['seconds']}s  {refresh['pages_per_s']} pages/s  {refresh['failed']} failed  "
+              f"{refresh['chunks']} chunks  {refresh['catalog_products']} catalog products")
+        print("      stages    " + "  ".join(f"{name} {stage['busy_s']}s busy/{stage['blocked_s']}s blocked"
+                                             for name, stage in refresh["pipeline"].items()))
+        dedup = refresh["dedup"]
+        if dedup:
+            print(f"      dedup     {dedup['boilerplate_ratio']:.0%} boilerplate  "
+                  f"{dedup['duplicate_chunks']}/{dedup['new_chunks']} chunks dropped  "
+                  f"{dedup['embedding_batches_saved']} embed batches saved")
+        for stage in ("retrieval", "get_response"):
+            print(f"      {stage:<13} p50 {stages[stage]['p50_ms']} ms  p99 {stages[stage]['p99_ms']} ms  "
+                  f"{stages[stage]['qps']} q/s")
+        print(f"      peak RSS {result['peak_rss_mb']} MB (parser workers {result['peak_child_rss_mb']} MB)")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare, 'r') as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Compare the HTML extraction backends on saved brand pages.
+
+    python benchmarks/bench_parsers.py                   # pages in benchmarks/fixtures/pages
+    python benchmarks/bench_parsers.py --fetch 10        # save the first 10 urls.txt pages first
+
+Each backend runs in its own process so the reported peak RSS is not polluted by the others.
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from extraction import BACKENDS, available_backends, extract_page  # noqa: E402
+
+DEFAULT_PAGES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "pages")
+
+
+def fetch_pages(count, pages_dir):
+    import requests
+
+    os.makedirs(pages_dir, exist_ok=True)
+    with open(os.path.join(ROOT, "urls.txt"), 'r') as file:
+        urls = [url for url in file.read().splitlines() if url][:count]
+    for url in urls:
+        try:
+            response = requests.get(url, timeout=30)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"skip {url}: {e}")
+            continue
+        name = url.split("//", 1)[-1].replace("/", "_") + ".html"
+        with open(os.path.join(pages_dir, name), 'w', encoding='utf-8') as file:
+            file.write(response.text)
+
+
+def load_pages(pages_dir):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(pages_dir, "*.html"))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as file:
+            pages.append(file.read())
+    return pages
+
+
+def run_backend(backend, pages, rounds, queue):
+    extract_page(pages[0], backend)  # warm up imports
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            extract_page(html, backend)
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        "backend": backend,
+        "pages": len(pages) * rounds,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(len(pages) * rounds / elapsed, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages-dir", default=DEFAULT_PAGES_DIR)
+    parser.add_argument("--fetch", type=int, default=0, help="download this many urls.txt pages first")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.fetch:
+        fetch_pages(args.fetch, args.pages_dir)
+    pages = load_pages(args.pages_dir)
+    if not pages:
+        sys.exit(f"No saved pages in {args.pages_dir}; run with --fetch N first")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in BACKENDS:
+        if backend not in available_backends():
+            print(f"{backend:<11} not installed")
+            continue
+        queue = ctx.Queue()
+        process = ctx.Process(target=run_backend, args=(backend, pages, args.rounds, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+        print(f"{backend:<11} {result['pages_per_sec']:>8} pages/s  peak RSS {result['peak_rss_mb']} MB")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
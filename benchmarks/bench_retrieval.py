@@ -0,0 +1,123 @@
+"""Compare dense, sparse (BM25) and hybrid retrieval on a synthetic product corpus.
+
+    python benchmarks/bench_retrieval.py --products 2000 --queries 200
+    python benchmarks/bench_retrieval.py --embedder ollama     # real mxbai-embed-large via OLLAMA_URL
+
+Reports recall@k and p50/p99 latency per mode.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from langchain_community.vectorstores import Chroma  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+
+from fakes import HashingEmbeddings  # noqa: E402
+from hybrid import BM25Index, HybridRetriever  # noqa: E402
+from indexer import chunk_id  # noqa: E402
+
+BRANDS = ["khaadi", "sapphire", "gul ahmed", "alkaram", "limelight", "bonanza", "nishat", "junaid jamshed"]
+FABRICS = ["lawn", "khaddar", "chiffon", "cotton", "silk", "linen", "karandi", "cambric"]
+ITEMS = ["kurta", "shirt", "dupatta", "trouser", "suit", "shalwar kameez", "waistcoat", "abaya"]
+COLORS = ["black", "white", "blue", "maroon", "mint", "peach", "mustard", "teal"]
+BOILERPLATE = "Free delivery on orders above Rs. 5,000. Sign up for our newsletter. Customer care 021-111-000-000."
+
+
+def build_corpus(count, rng):
+    docs = []
+    for i in range(count):
+        brand, fabric, item, color = rng.choice(BRANDS), rng.choice(FABRICS), rng.choice(ITEMS), rng.choice(COLORS)
+        sku = f"ks{10000 + i}"
+        text = (f"{brand.title()} {color} {fabric} {item} SKU {sku.upper()} price Rs. {rng.randrange(1990, 14990, 100)} "
+                f"{BOILERPLATE}")
+        docs.append((Document(page_content=text, metadata={"source": f"https://{brand.replace(' ', '')}.pk/{i}"}),
+                     {"brand": brand, "fabric": fabric, "item": item, "color": color, "sku": sku}))
+    return docs
+
+
+def build_queries(corpus, count, rng):
+    queries = []
+    for _ in range(count):
+        doc, attrs = rng.choice(corpus)
+        if rng.random() < 0.4:
+            relevant = {chunk_id(doc.metadata["source"], doc.page_content)}
+            queries.append((attrs["sku"], relevant))
+        else:
+            relevant = {chunk_id(d.metadata["source"], d.page_content) for d, a in corpus
+                        if a["brand"] == attrs["brand"] and a["fabric"] == attrs["fabric"] and a["item"] == attrs["item"]}
+            queries.append((f"{attrs['fabric']} {attrs['item']} from {attrs['brand']}", relevant))
+    return queries
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--embedder", choices=["hashing", "ollama"], default="hashing")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    corpus = build_corpus(args.products, rng)
+    queries = build_queries(corpus, args.queries, rng)
+
+    if args.embedder == "ollama":
+        from embedding import create_embeddings
+        embeddings, _ = create_embeddings("ollama")
+    else:
+        embeddings = HashingEmbeddings()
+
+    ids = [chunk_id(doc.metadata["source"], doc.page_content) for doc, _ in corpus]
+    start = time.perf_counter()
+    vector_store = Chroma.from_documents([doc for doc, _ in corpus], embeddings, ids=ids,
+                                         collection_name="bench_retrieval")
+    dense_build = time.perf_counter() - start
+    start = time.perf_counter()
+    bm25 = BM25Index()
+    for doc_id, (doc, _) in zip(ids, corpus):
+        bm25.add(doc_id, doc.page_content, doc.metadata)
+    sparse_build = time.perf_counter() - start
+    print(f"indexed {len(corpus)} chunks: dense {dense_build:.2f}s, bm25 {sparse_build:.2f}s")
+
+    results = []
+    for mode in ("dense", "sparse", "hybrid"):
+        retriever = HybridRetriever(vector_store=vector_store, bm25=bm25, k=args.k, mode=mode)
+        latencies, recalls = [], []
+        for query, relevant in queries:
+            start = time.perf_counter()
+            docs = retriever.invoke(query)
+            latencies.append(time.perf_counter() - start)
+            found = {chunk_id(doc.metadata["source"], doc.page_content) for doc in docs}
+            recalls.append(len(found & relevant) / min(len(relevant), args.k))
+        result = {
+            "mode": mode,
+            f"recall@{args.k}": round(statistics.mean(recalls), 3),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        }
+        results.append(result)
+        print(f"{mode:<7} recall@{args.k} {result[f'recall@{args.k}']:.3f}  "
+              f"p50 {result['p50_ms']} ms  p99 {result['p99_ms']} ms")
+
+    vector_store.delete_collection()
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measure cold import time of the app modules and Streamlit rerun latency.
+
+    python benchmarks/bench_startup.py --reruns 20
+
+Imports run in a fresh interpreter per module. Reruns use streamlit's AppTest with
+DISABLE_BACKGROUND_JOBS=1, so no scraping thread or Chrome is started.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, "src")
+
+IMPORT_SNIPPET = """
+import sys, time
+sys.path.insert(0, {src!r})
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def cold_import(module, repeats):
+    timings = []
+    for _ in range(repeats):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET.format(src=SRC, module=module)],
+                                check=True, capture_output=True, text=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def app_reruns(count, workdir):
+    from streamlit.testing.v1 import AppTest
+
+    os.chdir(workdir)
+    sys.path.insert(0, SRC)
+    app = AppTest.from_file(os.path.join(SRC, "app.py"), default_timeout=120)
+    start = time.perf_counter()
+    app.run()
+    first = time.perf_counter() - start
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - start)
+    return first, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=3, help="cold imports per module")
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = {"imports": {}}
+    # app.py only runs under streamlit; it is covered by the rerun timings below
+    for module in ("main", "services"):
+        timings = cold_import(module, args.repeats)
+        results["imports"][module] = round(statistics.median(timings) * 1000, 1)
+        print(f"import {module:<9} {results['imports'][module]} ms (median of {args.repeats})")
+
+    os.environ["DISABLE_BACKGROUND_JOBS"] = "1"
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ["VECTOR_STORE_DIR"] = os.path.join(workdir, "vector_store")
+        first, timings = app_reruns(args.reruns, workdir)
+        os.chdir(ROOT)
+    results["first_run_ms"] = round(first * 1000, 1)
+    results["rerun_p50_ms"] = round(statistics.median(timings) * 1000, 1)
+    results["rerun_max_ms"] = round(max(timings) * 1000, 1)
+    print(f"first run {results['first_run_ms']} ms, rerun p50 {results['rerun_p50_ms']} ms, "
+          f"max {results['rerun_max_ms']} ms over {args.reruns} reruns")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Deterministic stand-ins for the embedding model and the chat model, so benchmarks run offline."""
+import re
+import time
+import zlib
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class HashingEmbeddings(Embeddings):
+    """Deterministic bag-of-words embedder, so dense retrieval can run without a model server.
+
+    batch_delay adds a fixed wait per embed_documents call, like a round trip to the model server.
+    """
+
+    def __init__(self, dim=256, batch_delay=0.0):
+        self.dim = dim
+        self.batch_delay = batch_delay
+
+    def _embed(self, text):
+        vector = [0.0] * self.dim
+        for token in text.lower().split():
+            vector[zlib.crc32(token.encode()) % self.dim] += 1.0
+        norm = sum(value * value for value in vector) ** 0.5 or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts):
+        if self.batch_delay:
+            time.sleep(self.batch_delay)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """Streams a canned answer that names the retrieved sources, optionally at a fixed per-token delay."""
+
+    answer_tokens: int = 60
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _tokens(self, messages):
+        prompt = "\n".join(str(message.content) for message in messages)
+        sources = re.findall(r"Source: (\S+)", prompt)[:3]
+        words = f"Based on {len(sources)} sources such as {', '.join(sources) or 'none'}, here are some options".split()
+        filler = ["lawn", "kurta", "in", "pastel", "shades", "with", "embroidered", "dupatta"]
+        while len(words) < self.answer_tokens:
+            words.append(filler[len(words) % len(filler)])
+        return [word + " " for word in words[:self.answer_tokens]]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        content = "".join(chunk.message.content for chunk in self._stream(messages))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for token in self._tokens(messages):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
@@ -0,0 +1,219 @@
+"""Local aiohttp site farm serving recorded brand pages with injected latency and failures.
+
+Each brand domain from urls.txt gets its own port on 127.0.0.1, so per-host limits, caching and
+catalog extraction behave as they do against the real sites. Pages come from
+benchmarks/fixtures/sites/<domain>.html when recorded, otherwise from the sample collection page,
+with a deterministic product listing appended so every (site, page) has distinct text.
+
+    python benchmarks/site_farm.py --record             # save the live home page of every urls.txt site
+    python benchmarks/site_farm.py --pages-per-site 10  # serve until interrupted
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import socket
+import sys
+import threading
+
+from aiohttp import web
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from url_registry import brand_from_url, load_sites  # noqa: E402
+
+SITES_DIR = os.path.join(ROOT, "benchmarks", "fixtures", "sites")
+SAMPLE_PAGE = os.path.join(ROOT, "benchmarks", "fixtures", "pages", "sample_collection.html")
+
+FABRICS = ["lawn", "khaddar", "chiffon", "cotton", "silk", "linen", "karandi", "cambric"]
+ITEMS = ["kurta", "shirt", "dupatta", "trouser", "suit", "shalwar kameez", "waistcoat", "abaya"]
+COLORS = ["black", "white", "blue", "maroon", "mint", "peach", "mustard", "teal"]
+
+
+def load_domains(limit=None):
+    return [site.domain for site in load_sites(os.path.join(ROOT, "urls.txt"))][:limit]
+
+
+def record(domains):
+    import requests
+
+    os.makedirs(SITES_DIR, exist_ok=True)
+    for domain in domains:
+        try:
+            response = requests.get(f"https://{domain}", timeout=30)
+            response.raise_for_status()
+        except Exception as e:
+            print(f"skip {domain}: {e}")
+            continue
+        with open(os.path.join(SITES_DIR, f"{domain}.html"), 'w', encoding='utf-8') as file:
+            file.write(response.text)
+        print(f"recorded {domain} ({len(response.text)} bytes)")
+
+
+def product_listing(brand, domain, page, count=24):
+    rng = random.Random(f"{domain}/{page}")
+    rows = []
+    for i in range(count):
+        fabric, item, color = rng.choice(FABRICS), rng.choice(ITEMS), rng.choice(COLORS)
+        rows.append(f'<div class="product"><a href="/products/{brand}-{page}-{i}">{brand.title()} {color} {fabric} '
+                    f'{item}</a> <span class="sku">SKU {brand[:2].upper()}{page:03d}{i:03d}</span> '
+                    f'<span class="price">Rs. {rng.randrange(1990, 14990, 100):,}</span></div>')
+    return "\n".join(rows)
+
+
+def shopify_products(brand, domain, count):
+    rng = random.Random(domain)
+    products = []
+    for i in range(count):
+        fabric, item, color = rng.choice(FABRICS), rng.choice(ITEMS), rng.choice(COLORS)
+        products.append({
+            "title": f"{color.title()} {fabric} {item}",
+            "handle": f"{brand}-{i}",
+            "vendor": brand,
+            "product_type": item,
+            "tags": [fabric, color],
+            "options": [{"name": "Color"}],
+            "variants": [{"price": str(rng.randrange(1990, 14990, 100)), "option1": color}],
+            "images": [{"src": f"https://cdn.{domain}/images/{brand}-{i}.jpg"}],
+        })
+    return {"products": products}
+
+
+class SiteFarm:
+    """Serves every domain on its own local port until stop() is called."""
+
+    def __init__(self, domains, pages_per_site=1, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 products_per_site=20, seed=42):
+        self.domains = domains
+        self.pages_per_site = pages_per_site
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.products_per_site = products_per_site
+        self.rng = random.Random(seed)
+        self.ports = {}
+        self.domain_by_port = {}
+        self.templates = {}
+        self.requests = 0
+        self.failures = 0
+        self.loop = None
+        self.runner = None
+        self.thread = None
+
+    def template(self, domain):
+        if domain not in self.templates:
+            path = os.path.join(SITES_DIR, f"{domain}.html")
+            with open(path if os.path.exists(path) else SAMPLE_PAGE, 'r', encoding='utf-8') as file:
+                self.templates[domain] = file.read()
+        return self.templates[domain]
+
+    def page(self, domain, page):
+        brand = brand_from_url(f"https://{domain}")
+        listing = product_listing(brand, domain, page)
+        html = self.template(domain)
+        marker = html.lower().rfind("</body>")
+        if marker < 0:
+            marker = len(html)
+        return f"{html[:marker]}<section class=\"listing\">{listing}</section>{html[marker:]}"
+
+    def urls(self):
+        urls = []
+        for domain, port in self.ports.items():
+            urls.append(f"http://127.0.0.1:{port}/")
+            urls.extend(f"http://127.0.0.1:{port}/p/{page}" for page in range(1, self.pages_per_site))
+        return urls
+
+    async def handle(self, request):
+        self.requests += 1
+        delay = max(0.0, self.rng.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+        if delay:
+            await asyncio.sleep(delay)
+        if self.rng.random() < self.failure_rate:
+            self.failures += 1
+            return web.Response(status=503, text="injected failure")
+
+        domain = self.domain_by_port[request.url.port]
+        path = request.path
+        if path == "/products.json":
+            brand = brand_from_url(f"https://{domain}")
+            page = int(request.query.get("page", 1))
+            payload = shopify_products(brand, domain, self.products_per_site) if page == 1 else {"products": []}
+            return web.json_response(payload)
+        if path == "/":
+            body = self.page(domain, 0)
+        elif path.startswith("/p/") and path[3:].isdigit() and int(path[3:]) < self.pages_per_site:
+            body = self.page(domain, int(path[3:]))
+        else:
+            return web.Response(status=404)
+
+        etag = '"' + hashlib.md5(body.encode('utf-8')).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=body, content_type="text/html", headers={"ETag": etag})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        for domain in self.domains:
+            sock = socket.socket()
+            sock.bind(("127.0.0.1", 0))
+            self.ports[domain] = sock.getsockname()[1]
+            await web.SockSite(self.runner, sock).start()
+        self.domain_by_port = {port: domain for domain, port in self.ports.items()}
+
+    def start_in_thread(self):
+        # Runs the farm on its own event loop so the code under test can own the main loop
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.start())
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait()
+        return self.urls()
+
+    def stop(self):
+        if self.loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="save live pages for the urls.txt domains and exit")
+    parser.add_argument("--sites", type=int, help="only the first N domains of urls.txt")
+    parser.add_argument("--pages-per-site", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=50, help="mean response delay in ms")
+    parser.add_argument("--jitter", type=float, default=0, help="standard deviation of the delay in ms")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with 503")
+    args = parser.parse_args()
+
+    domains = load_domains(args.sites)
+    if args.record:
+        record(domains)
+        return
+    farm = SiteFarm(domains, args.pages_per_site, args.latency / 1000, args.jitter / 1000, args.failure_rate)
+    urls = farm.start_in_thread()
+    print(json.dumps(urls[:5], indent=2))
+    print(f"serving {len(urls)} pages from {len(domains)} sites, Ctrl+C to stop")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        farm.stop()
+
+
+if __name__ == "__main__":
+    main()
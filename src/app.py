@@ -1,71 +1,31 @@
 import streamlit as st
-import threading
 import logging
 import os
-from sqlalchemy import create_engine, Column, Integer, String
-from sqlalchemy.orm import declarative_base, sessionmaker
-import bcrypt
-from main import get_fashion_bot
-from urls_finder import URLFinder
+import services
+from metrics import metrics
 
 # =======================
-# Database Configuration
+# Services
 # =======================
 
-Base = declarative_base()
-
-class User(Base):
-    __tablename__ = 'users'
-    
-    id = Column(Integer, primary_key=True)
-    email = Column(String(120), unique=True, nullable=False)
-    username = Column(String(150), unique=True, nullable=False)
-    password = Column(String(60), nullable=False)
-    
-# Create SQLite engine and session
-engine = create_engine('sqlite:///users.db', connect_args={"check_same_thread": False})
-Base.metadata.create_all(engine)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-db_session = SessionLocal()
-
-# =======================
-# Logging Configuration
-# =======================
-
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    filename='fashion_bot_app.log',
-                    filemode='a')
-
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-
-logging.getLogger('').addHandler(console_handler)
+# Created once per process and reused on every rerun
+services.bootstrap()
 logger = logging.getLogger(__name__)
 
-# =======================
-# Initialize FashionBot
-# =======================
+auth = services.get_auth_service()
 
-fashion_bot = get_fashion_bot()
-logger.info("FashionBot instance created")
+fashion_bot = services.get_fashion_bot()
+# Product images are shown as locally cached thumbnails, never hot-linked from brand CDNs
+image_proxy = services.get_image_proxy()
 
-def start_url_finder():
-    url_finder = URLFinder()
-    search_query = "Pakistani women fashion brands"  # or any appropriate search term
-    url_finder.find_urls(search_query)
-    logger.info("URL Finder started")
+# Initialize the URLFinder
+services.start_url_finder()
 
-def initialize_url_finder():
-    url_finder_thread = threading.Thread(target=start_url_finder)
-    url_finder_thread.daemon = True
-    url_finder_thread.start()
-    logger.info("URL Finder thread initialized")
+# Prometheus text format on METRICS_PORT
+services.start_metrics_server()
 
-# Initialize the URLFinder
-initialize_url_finder()
+# Comma-separated emails allowed to see the metrics page
+ADMIN_EMAILS = {email.strip() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
 
 # =======================
 # Streamlit Configuration
@@ -82,27 +42,43 @@ logger.info("Streamlit page configured")
 # Authentication Functions
 # =======================
 
-def hash_password(password: str) -> bytes:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+def register_user(email: str, username: str, password: str) -> bool:
+    return auth.register(email, username, password)
 
-def verify_password(password: str, hashed: bytes) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed)
+def authenticate_user(email: str, password: str):
+    # Returns a signed session token, or None if the credentials are wrong
+    return auth.login(email, password)
 
-def register_user(email: str, username: str, password: str) -> bool:
-    existing_user = db_session.query(User).filter((User.email == email) | (User.username == username)).first()
-    if existing_user:
-        return False
-    hashed_pw = hash_password(password)
-    new_user = User(email=email, username=username, password=hashed_pw)
-    db_session.add(new_user)
-    db_session.commit()
-    return True
-
-def authenticate_user(email: str, password: str) -> bool:
-    user = db_session.query(User).filter(User.email == email).first()
-    if user and verify_password(password, user.password):
-        return True
-    return False
+def restore_session():
+    # A valid token from an earlier login skips bcrypt on every rerun
+    token = st.session_state.get('auth_token')
+    email = auth.verify_token(token) if token else None
+    st.session_state['authenticated'] = email is not None
+    st.session_state['user_email'] = email or ''
+
+def show_images(image_urls):
+    thumbnails = image_proxy.thumbnails(image_urls)
+    if thumbnails:
+        st.image(thumbnails, width=160)
+
+# =======================
+# Admin Metrics Page
+# =======================
+
+def render_metrics_page():
+    st.header("Pipeline Metrics")
+    if not metrics.enabled:
+        st.info("Metrics are disabled (METRICS_ENABLED=0).")
+        return
+    snapshot = metrics.snapshot()
+    st.subheader("Stage timings")
+    st.dataframe(snapshot["stages"], use_container_width=True)
+    st.subheader("Gauges")
+    st.dataframe(snapshot["gauges"], use_container_width=True)
+    st.subheader("Counters")
+    st.dataframe(snapshot["counters"], use_container_width=True)
+    if st.button("Refresh"):
+        st.rerun()
 
 # =======================
 # Streamlit App Layout
@@ -120,6 +96,7 @@ def main():
         st.session_state['user_email'] = ''
     if 'conversation' not in st.session_state:
         st.session_state['conversation'] = []
+    restore_session()
     
     # Display Login or Registration Forms
     if not st.session_state['authenticated']:
@@ -159,8 +136,9 @@ def main():
                 if not login_email or not login_password:
                     st.error("Please enter both email and password.")
                 else:
-                    authenticated = authenticate_user(login_email, login_password)
-                    if authenticated:
+                    token = authenticate_user(login_email, login_password)
+                    if token:
+                        st.session_state['auth_token'] = token
                         st.session_state['authenticated'] = True
                         st.session_state['user_email'] = login_email
                         st.success("Logged in successfully!")
@@ -175,6 +153,8 @@ def main():
 
         if st.sidebar.button("Logout"):
             # Reset session state for user logout
+            fashion_bot.clear_session(st.session_state['user_email'])
+            st.session_state['auth_token'] = None
             st.session_state['authenticated'] = False
             st.session_state['user_email'] = ''
             st.session_state['conversation'] = []
@@ -183,41 +163,43 @@ def main():
 
             # Use st.experimental_set_query_params to force rerun after logout
             st.experimental_set_query_params(logged_out="true")
+
+        if st.session_state['user_email'] in ADMIN_EMAILS:
+            if st.sidebar.radio("View", ["Chat", "Metrics"]) == "Metrics":
+                render_metrics_page()
+                return
         
         st.header("Ask About Fashion Brands")
         user_input = st.chat_input("Type your question here...")
         
-        if user_input:
-            logger.info(f"Received user input from {st.session_state['user_email']}: {user_input}")
-            st.session_state.conversation.append({"role": "user", "content": user_input})
-            with st.spinner("Generating response..."):
-                response = fashion_bot.get_response(user_input)
-            st.session_state.conversation.append({"role": "bot", "content": response})
-            logger.info(f"Response generated for user {st.session_state['user_email']}")
-        
         # Display the conversation
         for message in st.session_state.conversation:
             if message["role"] == "user":
                 st.chat_message("user").write(message["content"])
             else:
-                st.chat_message("assistant").write(message["content"])
-                
-                # Check if the message content is a dictionary
-                if isinstance(message["content"], dict):
-                    if "images" in message["content"]:
-                        # Ensure images is a list before iterating
-                        for img_url in message["content"]["images"]:
-                            if isinstance(img_url, str):  # Check if img_url is a string
-                                st.image(img_url, use_column_width=True)  # Display the image
-                                logger.debug(f"Image displayed: {img_url}")
-                    else:
-                        logger.warning("No 'images' key found in message['content']")
-                else:
-                    logger.error("message['content'] is not a dictionary: ", message["content"])
+                with st.chat_message("assistant"):
+                    st.write(message["content"])
+                    # Served from the thumbnail cache; re-renders make no outbound requests
+                    show_images(message.get("images", []))
+        
+        if user_input:
+            logger.info(f"Received user input from {st.session_state['user_email']}: {user_input}")
+            st.chat_message("user").write(user_input)
+            # Stream the answer as it is generated; history is kept per logged-in user
+            images = []
+            with st.chat_message("assistant"):
+                response = st.write_stream(
+                    fashion_bot.stream_response(user_input, session_id=st.session_state['user_email'], images=images)
+                )
+                show_images(images)
+            st.session_state.conversation.append({"role": "user", "content": user_input})
+            st.session_state.conversation.append({"role": "bot", "content": response, "images": images})
+            logger.info(f"Response generated for user {st.session_state['user_email']}")
         
         # Clear chat history button
         if st.button("Clear Chat History"):
             st.session_state["conversation"] = []
+            fashion_bot.clear_session(st.session_state['user_email'])
             st.success("Chat history cleared.")
             logger.info(f"Chat history cleared for user {st.session_state['user_email']}")
 
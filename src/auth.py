@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import bcrypt
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from models import Base, User
+
+logger = logging.getLogger(__name__)
+
+
+def _configure_sqlite(dbapi_connection, connection_record):
+    # WAL lets logins read while a registration writes; busy_timeout waits out short write locks
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
+
+
+class AuthService:
+    """User registration and login backed by a pooled engine, with bcrypt off the calling thread.
+
+    Each call opens its own short-lived session, so Streamlit session threads never share one.
+    Successful logins return an HMAC-signed token that later reruns check without touching bcrypt.
+    """
+
+    def __init__(self, database_url=None, bcrypt_rounds=None, hash_workers=None, pool_size=None,
+                 secret=None, token_ttl=None):
+        self.database_url = database_url or os.getenv("AUTH_DATABASE_URL", "sqlite:///users.db")
+        self.bcrypt_rounds = bcrypt_rounds or int(os.getenv("BCRYPT_ROUNDS", 12))
+        self.token_ttl = token_ttl or int(os.getenv("AUTH_TOKEN_TTL", 12 * 3600))
+        secret = secret or os.getenv("AUTH_SECRET")
+        if not secret:
+            # Tokens then only survive as long as the process; set AUTH_SECRET to keep them across restarts
+            logger.warning("AUTH_SECRET is not set, using a random per-process signing key")
+            secret = secrets.token_hex(32)
+        self.secret = secret.encode('utf-8')
+
+        pool_size = pool_size or int(os.getenv("DB_POOL_SIZE", 5))
+        connect_args = {}
+        if self.database_url.startswith("sqlite"):
+            connect_args = {"check_same_thread": False, "timeout": 30}
+        self.engine = create_engine(self.database_url, connect_args=connect_args,
+                                    pool_size=pool_size, max_overflow=pool_size * 2, pool_pre_ping=True)
+        if self.engine.dialect.name == "sqlite":
+            event.listen(self.engine, "connect", _configure_sqlite)
+        Base.metadata.create_all(self.engine)
+        self.session_factory = sessionmaker(bind=self.engine, autocommit=False, autoflush=False,
+                                            expire_on_commit=False)
+
+        hash_workers = hash_workers or int(os.getenv("BCRYPT_WORKERS", min(4, os.cpu_count() or 1)))
+        self.hash_pool = ThreadPoolExecutor(max_workers=hash_workers, thread_name_prefix="bcrypt")
+        # Compared against when the email is unknown so that a miss costs as much as a wrong password
+        self.dummy_hash = bcrypt.hashpw(b"dummy", bcrypt.gensalt(self.bcrypt_rounds))
+        logger.info(f"Auth service ready: bcrypt cost {self.bcrypt_rounds}, {hash_workers} hash workers, "
+                    f"pool size {pool_size}")
+
+    @contextmanager
+    def session(self):
+        session = self.session_factory()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def hash_password(self, password):
+        salt = bcrypt.gensalt(self.bcrypt_rounds)
+        return self.hash_pool.submit(bcrypt.hashpw, password.encode('utf-8'), salt).result()
+
+    def verify_password(self, password, hashed):
+        if isinstance(hashed, str):
+            hashed = hashed.encode('utf-8')
+        return self.hash_pool.submit(bcrypt.checkpw, password.encode('utf-8'), hashed).result()
+
+    def register(self, email, username, password):
+        with self.session() as session:
+            exists = session.query(User.id).filter((User.email == email) | (User.username == username)).first()
+        if exists:
+            return False
+        hashed_pw = self.hash_password(password)
+        try:
+            with self.session() as session:
+                session.add(User(email=email, username=username, password=hashed_pw))
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same email or username
+            return False
+        return True
+
+    def authenticate(self, email, password):
+        with self.session() as session:
+            row = session.query(User.password).filter(User.email == email).first()
+        if row is None:
+            self.verify_password(password, self.dummy_hash)
+            return False
+        return self.verify_password(password, row.password)
+
+    def login(self, email, password):
+        # Returns a session token on success, None otherwise
+        if not self.authenticate(email, password):
+            return None
+        return self.issue_token(email)
+
+    def _sign(self, payload):
+        return hmac.new(self.secret, payload, hashlib.sha256).hexdigest()
+
+    def issue_token(self, email):
+        expires = int(time.time()) + self.token_ttl
+        payload = base64.urlsafe_b64encode(f"{email}|{expires}".encode('utf-8'))
+        return f"{payload.decode('ascii')}.{self._sign(payload)}"
+
+    def verify_token(self, token):
+        # Returns the email the token was issued to, or None if it is forged, malformed or expired
+        try:
+            payload, signature = token.rsplit(".", 1)
+            if not hmac.compare_digest(signature, self._sign(payload.encode('ascii'))):
+                return None
+            email, expires = base64.urlsafe_b64decode(payload).decode('utf-8').rsplit("|", 1)
+        except (AttributeError, ValueError, UnicodeError):
+            return None
+        if int(expires) < time.time():
+            return None
+        return email
+
+    def close(self):
+        self.hash_pool.shutdown(wait=True)
+        self.engine.dispose()
@@ -0,0 +1,402 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from urllib.parse import urljoin, urlparse
+
+import numpy as np
+
+from url_registry import brand_from_url
+
+logger = logging.getLogger(__name__)
+
+COLORS = (
+    "black", "white", "off white", "blue", "navy", "sky blue", "red", "maroon", "pink", "peach",
+    "green", "mint", "olive", "teal", "yellow", "mustard", "orange", "rust", "purple", "lilac",
+    "grey", "gray", "beige", "brown", "cream", "gold", "silver", "multi",
+)
+_LOC = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+_JSON_LD = re.compile(r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL)
+_PRICE = re.compile(r"(?:under|below|less than|upto|up to|within|max)\s*(?:pkr|rs\.?)?\s*([\d,]+)")
+_MIN_PRICE = re.compile(r"(?:over|above|more than|from|min)\s*(?:pkr|rs\.?)?\s*([\d,]{3,})")
+_BETWEEN = re.compile(r"between\s*(?:pkr|rs\.?)?\s*([\d,]+)\s*(?:and|-|to)\s*(?:pkr|rs\.?)?\s*([\d,]+)")
+
+
+@dataclass
+class Product:
+    brand: str
+    title: str
+    price: float
+    color: str
+    category: str
+    image: str
+    url: str
+
+
+def _filter_text(question):
+    return " ".join(re.sub(r"[^\w\s,.\-]", " ", question.lower()).split())
+
+
+def match_brands(question, brands):
+    # A brand is named in full, or by a word (or two adjacent words run together) of five or more
+    # letters it starts with, e.g. "sapphire" for sapphireonline or "gul ahmed" for gulahmedshop
+    text = _filter_text(question)
+    tokens = [token for token in re.split(r"[\s,.]+", text) if token]
+    words = [word for word in tokens + [a + b for a, b in zip(tokens, tokens[1:])] if len(word) >= 5]
+    return [brand for brand in brands
+            if re.search(rf"\b{re.escape(brand)}\b", text) or any(brand.startswith(word) for word in words)]
+
+
+def match_colors(question, colors=COLORS):
+    text = _filter_text(question)
+    return [color for color in colors if color and re.search(rf"\b{re.escape(color)}\b", text)]
+
+
+def detect_color(*texts):
+    haystack = " ".join(text.lower() for text in texts if text)
+    # Longest names first so "sky blue" wins over "blue"
+    for color in sorted(COLORS, key=len, reverse=True):
+        if re.search(rf"\b{re.escape(color)}\b", haystack):
+            return "grey" if color == "gray" else color
+    return ""
+
+
+def parse_price(value):
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def products_from_shopify(base_url, payload):
+    products = []
+    for item in payload.get("products", []):
+        variants = item.get("variants") or [{}]
+        prices = [parse_price(variant.get("price")) for variant in variants]
+        prices = [price for price in prices if price == price]
+        color = ""
+        for position, option in enumerate(item.get("options") or [], start=1):
+            if option.get("name", "").lower() in ("color", "colour"):
+                color = (variants[0].get(f"option{position}") or "").lower()
+        tags = item.get("tags") or []
+        if isinstance(tags, list):
+            tags = " ".join(tags)
+        images = item.get("images") or []
+        products.append(Product(
+            brand=(item.get("vendor") or brand_from_url(base_url)).strip().lower(),
+            title=item.get("title", "").strip(),
+            price=min(prices) if prices else float("nan"),
+            color=color or detect_color(item.get("title", ""), tags),
+            category=(item.get("product_type") or "").strip().lower(),
+            image=images[0].get("src", "") if images else "",
+            url=urljoin(base_url, f"/products/{item.get('handle', '')}"),
+        ))
+    return products
+
+
+def _json_ld_text(value, key="name"):
+    # JSON-LD values may be a string, a list of them or an object such as {"@type": "Brand", "name": ...}
+    if isinstance(value, list):
+        value = value[0] if value else ""
+    if isinstance(value, dict):
+        value = value.get(key) or ""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = str(value)
+    return value.strip() if isinstance(value, str) else ""
+
+
+def _json_ld_nodes(data):
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        graph = data.get("@graph")
+        return graph if isinstance(graph, list) else [data]
+    return []
+
+
+def product_from_json_ld(page_url, node):
+    types = node.get("@type")
+    if "Product" not in (types if isinstance(types, list) else [types]):
+        return None
+    offers = node.get("offers")
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if not isinstance(offers, dict):
+        offers = {}
+    name = _json_ld_text(node.get("name"))
+    image = _json_ld_text(node.get("image"), "url")
+    return Product(
+        brand=(_json_ld_text(node.get("brand")) or brand_from_url(page_url)).lower(),
+        title=name,
+        price=parse_price(offers.get("price") or offers.get("lowPrice")),
+        color=(_json_ld_text(node.get("color")) or detect_color(name, _json_ld_text(node.get("description")))).lower(),
+        category=_json_ld_text(node.get("category")).lower(),
+        image=urljoin(page_url, image) if image else "",
+        url=_json_ld_text(node.get("url")) or page_url,
+    )
+
+
+def products_from_json_ld(page_url, html):
+    # Shapes vary from theme to theme; a block that does not fit is skipped, not the whole site
+    products = []
+    for block in _JSON_LD.findall(html):
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        for node in _json_ld_nodes(data):
+            if not isinstance(node, dict):
+                continue
+            try:
+                product = product_from_json_ld(page_url, node)
+            except (AttributeError, TypeError, ValueError) as e:
+                logger.debug(f"Skipping JSON-LD product on {page_url}: {e}")
+                continue
+            if product is not None:
+                products.append(product)
+    return products
+
+
+class ProductCatalog:
+    """Columnar product store with brand, color and price-range indexes for pre-filtering."""
+
+    def __init__(self, columns=None):
+        columns = columns or {}
+        self.brands = [str(brand) for brand in columns.get("brands", [])]  # brand_codes index into it
+        self.colors = [str(color) for color in columns.get("colors", [])]
+        self.brand_codes = np.asarray(columns.get("brand_codes", []), dtype=np.int32)
+        self.color_codes = np.asarray(columns.get("color_codes", []), dtype=np.int32)
+        self.prices = np.asarray(columns.get("prices", []), dtype=np.float32)
+        self.titles = np.asarray(columns.get("titles", []), dtype=str)
+        self.categories = np.asarray(columns.get("categories", []), dtype=str)
+        self.images = np.asarray(columns.get("images", []), dtype=str)
+        self.urls = np.asarray(columns.get("urls", []), dtype=str)
+        # Unit-length embeddings of product_text(), one row per product; empty until embed() ran
+        self.vectors = np.asarray(columns.get("vectors", np.empty((0, 0))), dtype=np.float32)
+        if len(self.vectors) != len(self.prices):
+            self.vectors = np.empty((0, 0), dtype=np.float32)
+        self._build_indexes()
+
+    def __len__(self):
+        return len(self.prices)
+
+    @classmethod
+    def from_products(cls, products):
+        # Deduplicate by product URL, keeping the first record
+        seen = set()
+        unique = []
+        for product in products:
+            if product.url in seen or not product.title:
+                continue
+            seen.add(product.url)
+            unique.append(product)
+
+        brands = sorted({product.brand for product in unique})
+        colors = sorted({product.color for product in unique})
+        brand_index = {brand: i for i, brand in enumerate(brands)}
+        color_index = {color: i for i, color in enumerate(colors)}
+        return cls({
+            "brands": brands,
+            "colors": colors,
+            "brand_codes": [brand_index[product.brand] for product in unique],
+            "color_codes": [color_index[product.color] for product in unique],
+            "prices": [product.price for product in unique],
+            "titles": [product.title for product in unique],
+            "categories": [product.category for product in unique],
+            "images": [product.image for product in unique],
+            "urls": [product.url for product in unique],
+        })
+
+    def digest(self):
+        # Identifies the catalog's content, so an unchanged rebuild can keep cached answers
+        digest = hashlib.sha256()
+        for column in (self.urls, self.titles, self.categories, self.images):
+            digest.update("\n".join(column.tolist()).encode('utf-8'))
+        for values in (self.brands, self.colors):
+            digest.update("\n".join(values).encode('utf-8'))
+        for column in (self.brand_codes, self.color_codes, self.prices):
+            digest.update(column.tobytes())
+        digest.update(b"vectors" if len(self.vectors) else b"")
+        return digest.hexdigest()
+
+    def product_text(self, row):
+        return f"{self.brands[self.brand_codes[row]]} {self.titles[row]} {self.categories[row]}"
+
+    def embed(self, embed_documents):
+        # Done once per build, so answering a question only has to embed the question
+        if not len(self):
+            return
+        vectors = np.asarray(embed_documents([self.product_text(row) for row in range(len(self))]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        self.vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+    def _build_indexes(self):
+        self.brand_rows = {
+            brand: np.flatnonzero(self.brand_codes == code) for code, brand in enumerate(self.brands)
+        }
+        self.color_rows = {
+            color: np.flatnonzero(self.color_codes == code) for code, color in enumerate(self.colors)
+        }
+        priced = np.flatnonzero(~np.isnan(self.prices))
+        order = priced[np.argsort(self.prices[priced], kind="stable")]
+        self.price_order = order
+        self.sorted_prices = self.prices[order]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            brands=np.asarray(self.brands, dtype=str),
+            colors=np.asarray(self.colors, dtype=str),
+            brand_codes=self.brand_codes,
+            color_codes=self.color_codes,
+            prices=self.prices,
+            titles=self.titles,
+            categories=self.categories,
+            images=self.images,
+            urls=self.urls,
+            vectors=self.vectors,
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                return cls({name: data[name] for name in data.files})
+        except (OSError, ValueError, KeyError) as e:
+            logger.info(f"No product catalog loaded from {path}: {e}")
+            return cls()
+
+    def filter(self, brands=None, colors=None, min_price=None, max_price=None):
+        # Returns the row ids that satisfy every given constraint
+        rows = None
+        if brands:
+            rows = np.concatenate([self.brand_rows.get(brand, np.empty(0, np.int64)) for brand in brands])
+        if colors:
+            color_rows = np.concatenate([self.color_rows.get(color, np.empty(0, np.int64)) for color in colors])
+            rows = color_rows if rows is None else np.intersect1d(rows, color_rows)
+        if min_price is not None or max_price is not None:
+            lo = 0 if min_price is None else np.searchsorted(self.sorted_prices, min_price, side="left")
+            hi = len(self.sorted_prices) if max_price is None else np.searchsorted(self.sorted_prices, max_price, side="right")
+            price_rows = self.price_order[lo:hi]
+            rows = price_rows if rows is None else np.intersect1d(rows, price_rows)
+        if rows is None:
+            rows = np.arange(len(self))
+        return np.unique(rows)
+
+    def parse_filters(self, question):
+        text = _filter_text(question)
+        brands = match_brands(question, self.brands)
+        colors = match_colors(question, self.colors)
+
+        min_price = max_price = None
+        between = _BETWEEN.search(text)
+        if between:
+            min_price, max_price = sorted(parse_price(value) for value in between.groups())
+        else:
+            upper = _PRICE.search(text)
+            lower = _MIN_PRICE.search(text)
+            max_price = parse_price(upper.group(1)) if upper else None
+            min_price = parse_price(lower.group(1)) if lower else None
+        return {"brands": brands, "colors": colors, "min_price": min_price, "max_price": max_price}
+
+    def search(self, question, embed_query, k=5):
+        # Pre-filter with the indexes, then rank the candidates against their stored vectors
+        filters = self.parse_filters(question)
+        if not len(self) or not any(value for value in filters.values()):
+            return []
+        rows = self.filter(**filters)
+        if not len(rows):
+            return []
+        if not len(self.vectors):
+            # A catalog saved before it had vectors: filter order until the next build
+            return [self.product(row) for row in rows[:k]]
+        query = np.asarray(embed_query(question), dtype=np.float32)
+        scores = self.vectors[rows] @ query
+        best = rows[np.argsort(-scores, kind="stable")[:k]]
+        return [self.product(row) for row in best]
+
+    def product(self, row):
+        return Product(
+            brand=self.brands[self.brand_codes[row]],
+            title=str(self.titles[row]),
+            price=float(self.prices[row]),
+            color=self.colors[self.color_codes[row]],
+            category=str(self.categories[row]),
+            image=str(self.images[row]),
+            url=str(self.urls[row]),
+        )
+
+
+class CatalogBuilder:
+    """Collects product records per brand domain through Shopify products.json or sitemap.xml."""
+
+    def __init__(self, max_pages=None, max_sitemap_products=None):
+        self.max_pages = max_pages or int(os.getenv("CATALOG_MAX_PAGES", 4))
+        self.max_sitemap_products = max_sitemap_products or int(os.getenv("CATALOG_MAX_SITEMAP_PRODUCTS", 30))
+
+    async def build(self, crawler, urls, embed_documents=None):
+        # One catalog pass per site, however many of its pages are being crawled
+        sites = list(dict.fromkeys(f"{urlparse(url).scheme}://{urlparse(url).netloc}" for url in urls))
+        results = await asyncio.gather(*(self.products_for_site(crawler, url) for url in sites))
+        products = [product for site_products in results for product in site_products]
+        catalog = ProductCatalog.from_products(products)
+        if embed_documents is not None:
+            await asyncio.to_thread(catalog.embed, embed_documents)
+        sites = sum(1 for site_products in results if site_products)
+        logger.info(f"Product catalog built with {len(catalog)} products from {sites} sites")
+        return catalog
+
+    async def products_for_site(self, crawler, url):
+        base_url = f"{urlparse(url).scheme}://{urlparse(url).netloc}"
+        try:
+            products = await self.from_shopify(crawler, base_url)
+            if not products:
+                products = await self.from_sitemap(crawler, base_url)
+            return products
+        except Exception as e:
+            logger.warning(f"Product extraction failed for {base_url}: {e}")
+            return []
+
+    async def from_shopify(self, crawler, base_url):
+        products = []
+        for page in range(1, self.max_pages + 1):
+            result = await crawler.fetch(f"{base_url}/products.json?limit=250&page={page}")
+            if result is None or result.status != 200:
+                break
+            try:
+                payload = json.loads(result.text)
+            except ValueError:
+                break
+            page_products = products_from_shopify(base_url, payload)
+            if not page_products:
+                break
+            products.extend(page_products)
+        return products
+
+    async def from_sitemap(self, crawler, base_url):
+        result = await crawler.fetch(f"{base_url}/sitemap.xml")
+        if result is None or result.status != 200:
+            return []
+        locations = _LOC.findall(result.text)
+        if "<sitemapindex" in result.text:
+            # Follow only the product sitemaps of a sitemap index
+            children = [loc for loc in locations if "product" in loc.lower()][:2]
+            locations = []
+            for child in children:
+                child_result = await crawler.fetch(child)
+                if child_result is not None and child_result.status == 200:
+                    locations.extend(_LOC.findall(child_result.text))
+        product_urls = [loc for loc in locations if "/product" in loc.lower()][:self.max_sitemap_products]
+
+        pages = await asyncio.gather(*(crawler.fetch(product_url) for product_url in product_urls))
+        products = []
+        for product_url, page in zip(product_urls, pages):
+            if page is not None and page.status == 200:
+                products.extend(products_from_json_ld(product_url, page.text))
+        return products
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import time
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import aiohttp
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "PakFashionBot/1.0 (+https://github.com/The-Hexaa/PakFashion)"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class CrawlerConfig:
+    max_concurrency: int = 16
+    per_host_concurrency: int = 2
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 10.0
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30.0
+    cache_dir: str = "http_cache"
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=int(os.getenv("CRAWL_CONCURRENCY", cls.max_concurrency)),
+            per_host_concurrency=int(os.getenv("CRAWL_PER_HOST", cls.per_host_concurrency)),
+            connect_timeout=float(os.getenv("CRAWL_CONNECT_TIMEOUT", cls.connect_timeout)),
+            read_timeout=float(os.getenv("CRAWL_READ_TIMEOUT", cls.read_timeout)),
+            retries=int(os.getenv("CRAWL_RETRIES", cls.retries)),
+            cache_dir=os.getenv("HTTP_CACHE_DIR", cls.cache_dir),
+        )
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    text: str = ""
+    from_cache: bool = False  # True when the server answered 304 and the cached body was reused
+
+
+class HTTPCache:
+    """Keeps the last body and validators of every URL so refreshes can send conditional GETs."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{key}.json"), os.path.join(self.directory, f"{key}.body")
+
+    def get(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, 'r') as file:
+                meta = json.load(file)
+            with open(body_path, 'rb') as file:
+                meta["body"] = file.read()
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def store(self, url, headers, body, encoding):
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        meta_path, body_path = self._paths(url)
+        with open(body_path, 'wb') as file:
+            file.write(body)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({"url": url, "etag": etag, "last_modified": last_modified,
+                       "encoding": encoding, "stored_at": time.time()}, file)
+        os.replace(tmp_path, meta_path)
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+class CrawlStats:
+    def __init__(self):
+        self.requests = 0
+        self.responses = 0
+        self.not_modified = 0
+        self.retries = 0
+        self.failures = 0
+        self.bytes_fetched = 0
+        self.latencies = []
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+
+    def record(self, status, nbytes, latency):
+        self.responses += 1
+        self.bytes_fetched += nbytes
+        self.latencies.append(latency)
+        if status == 304:
+            self.not_modified += 1
+
+    @property
+    def not_modified_ratio(self):
+        return self.not_modified / self.responses if self.responses else 0.0
+
+    def latency_percentile(self, pct):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def as_dict(self):
+        end = self.finished_at or time.perf_counter()
+        return {
+            "requests": self.requests,
+            "responses": self.responses,
+            "not_modified": self.not_modified,
+            "not_modified_ratio": round(self.not_modified_ratio, 3),
+            "retries": self.retries,
+            "failures": self.failures,
+            "bytes_fetched": self.bytes_fetched,
+            "p95_latency_s": round(self.latency_percentile(95), 3),
+            "duration_s": round(end - self.started_at, 3),
+        }
+
+    def summary(self):
+        stats = self.as_dict()
+        return (
+            f"{stats['responses']} responses, {stats['bytes_fetched']} bytes, "
+            f"304 ratio {stats['not_modified_ratio']:.1%}, p95 {stats['p95_latency_s']}s, "
+            f"{stats['retries']} retries, {stats['failures']} failures in {stats['duration_s']}s"
+        )
+
+
+class Crawler:
+    """Bounded async fetcher: global and per-host caps, timeouts, retries and an HTTP cache."""
+
+    def __init__(self, config=None):
+        self.config = config or CrawlerConfig.from_env()
+        self.cache = HTTPCache(self.config.cache_dir) if self.config.cache_dir else None
+        self.stats = CrawlStats()
+        self.session = None
+        self._global_limit = None
+        self._host_limits = {}
+
+    async def __aenter__(self):
+        # Semaphores are created here so they belong to the loop that runs the crawl
+        self._global_limit = asyncio.Semaphore(self.config.max_concurrency)
+        self._host_limits = {}
+        connector = aiohttp.TCPConnector(
+            limit=self.config.max_concurrency,
+            limit_per_host=self.config.per_host_concurrency,
+            use_dns_cache=True,
+            ttl_dns_cache=self.config.dns_cache_ttl,
+            keepalive_timeout=self.config.keepalive_timeout,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=None,
+            sock_connect=self.config.connect_timeout,
+            sock_read=self.config.read_timeout,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector, timeout=timeout, headers={"User-Agent": USER_AGENT}
+        )
+        self.stats = CrawlStats()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.stats.finished_at = time.perf_counter()
+        await self.session.close()
+        self.session = None
+
+    def _host_limit(self, url):
+        host = urlparse(url).netloc
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.config.per_host_concurrency)
+        return self._host_limits[host]
+
+    def _backoff(self, attempt):
+        delay = min(self.config.backoff_max, self.config.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+    async def fetch(self, url):
+        # Returns a FetchResult, or None when every attempt failed with a network error
+        entry = await asyncio.to_thread(self.cache.get, url) if self.cache else None
+        headers = HTTPCache.conditional_headers(entry)
+
+        for attempt in range(self.config.retries + 1):
+            if attempt:
+                self.stats.retries += 1
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                async with self._global_limit, self._host_limit(url):
+                    self.stats.requests += 1
+                    start = time.perf_counter()
+                    async with self.session.get(url, headers=headers) as response:
+                        if response.status == 304 and entry is not None:
+                            latency = time.perf_counter() - start
+                            self.stats.record(304, 0, latency)
+                            metrics.observe("fetch", latency)
+                            metrics.inc("fetch_responses", status="304")
+                            text = entry["body"].decode(entry.get("encoding") or 'utf-8', errors='replace')
+                            return FetchResult(url, 200, text, from_cache=True)
+
+                        body = await response.read()
+                        latency = time.perf_counter() - start
+                        self.stats.record(response.status, len(body), latency)
+                        metrics.observe("fetch", latency)
+                        metrics.inc("fetch_responses", status=str(response.status))
+                        if response.status in RETRY_STATUSES and attempt < self.config.retries:
+                            logger.warning(f"{url} returned {response.status}, retrying")
+                            continue
+                        if response.status != 200:
+                            return FetchResult(url, response.status)
+
+                        try:
+                            encoding = response.get_encoding()
+                        except RuntimeError:
+                            encoding = 'utf-8'
+                        if self.cache:
+                            await asyncio.to_thread(self.cache.store, url, response.headers, body, encoding)
+                        return FetchResult(url, 200, body.decode(encoding, errors='replace'))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Attempt {attempt + 1} for {url} failed: {e!r}")
+
+        self.stats.failures += 1
+        metrics.inc("fetch_failures")
+        return None
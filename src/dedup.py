@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import re
+from collections import Counter, defaultdict
+from urllib.parse import urlparse
+
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_BITS = np.arange(64, dtype=np.uint64)
+
+
+def simhash(text, shingle=3):
+    # 64-bit SimHash over word 3-gram shingles; near-identical texts differ in only a few bits
+    words = _WORD.findall(text.lower())
+    if len(words) >= shingle:
+        features = [" ".join(words[i:i + shingle]) for i in range(len(words) - shingle + 1)]
+    else:
+        features = words or [text]
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+         for feature in features),
+        dtype=np.uint64, count=len(features),
+    )
+    ones = ((hashes[:, None] >> _BITS) & np.uint64(1)).sum(axis=0, dtype=np.int64)
+    value = 0
+    for bit in np.nonzero(ones * 2 > len(features))[0]:
+        value |= 1 << int(bit)
+    return value
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class SimHashIndex:
+    """Finds a stored signature within max_distance bits using band lookups.
+
+    With max_distance < bands, two signatures that close must agree exactly on at least one band,
+    so bands defaults to max_distance + 1 (at least 4). Larger distances mean narrower bands and
+    more candidates to compare.
+    """
+
+    def __init__(self, max_distance=3, bands=None):
+        bands = bands or max(4, max_distance + 1)
+        if not 0 <= max_distance < bands <= 64:
+            raise ValueError(f"SimHash distance {max_distance} needs 0 <= distance < bands <= 64, got {bands} bands")
+        self.max_distance = max_distance
+        self.bands = bands
+        self.width = 64 // bands
+        self.mask = (1 << self.width) - 1
+        self.tables = [defaultdict(set) for _ in range(bands)]
+        self.signatures = {}
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _keys(self, signature):
+        return [(signature >> (band * self.width)) & self.mask for band in range(self.bands)]
+
+    def add(self, item_id, signature):
+        self.signatures[item_id] = signature
+        for table, key in zip(self.tables, self._keys(signature)):
+            table[key].add(item_id)
+
+    def remove(self, item_id):
+        signature = self.signatures.pop(item_id, None)
+        if signature is None:
+            return
+        for table, key in zip(self.tables, self._keys(signature)):
+            table[key].discard(item_id)
+
+    def find(self, signature):
+        for table, key in zip(self.tables, self._keys(signature)):
+            for item_id in table.get(key, ()):
+                if hamming(signature, self.signatures[item_id]) <= self.max_distance:
+                    return item_id
+        return None
+
+
+def _normalize_line(line):
+    return " ".join(line.lower().split())
+
+
+class BoilerplateStripper:
+    """Drops text lines that repeat across most pages of one domain: menus, banners, footers.
+
+    Templates are learned from domains with at least min_pages pages in a cycle and remembered,
+    so later cycles with fewer pages of that domain are stripped the same way. The domain's
+    shortest URL, usually the home page, keeps its template lines so featured products and
+    store policies are still indexed once.
+    """
+
+    def __init__(self, min_pages=3, min_ratio=0.5):
+        self.min_pages = min_pages
+        self.min_ratio = min_ratio
+        self.templates = {}  # domain -> set of normalized template lines
+
+    def learn(self, documents):
+        pages = defaultdict(list)
+        for doc in documents:
+            pages[urlparse(doc.metadata["source"]).netloc].append(doc.page_content)
+        for domain, texts in pages.items():
+            if len(texts) < self.min_pages:
+                continue
+            frequency = Counter()
+            for text in texts:
+                frequency.update({_normalize_line(line) for line in text.splitlines() if line.strip()})
+            threshold = max(2, self.min_ratio * len(texts))
+            self.templates[domain] = {line for line, count in frequency.items() if count >= threshold}
+
+    def strip(self, documents):
+        # Returns the stripped documents and stats for this cycle
+        self.learn(documents)
+        canonical = {}
+        for doc in documents:
+            source = doc.metadata["source"]
+            domain = urlparse(source).netloc
+            if domain not in canonical or (len(source), source) < (len(canonical[domain]), canonical[domain]):
+                canonical[domain] = source
+        stripped = []
+        stats = {"pages": len(documents), "template_domains": 0, "lines_removed": 0,
+                 "chars_before": 0, "chars_after": 0}
+        domains = set()
+        for doc in documents:
+            domain = urlparse(doc.metadata["source"]).netloc
+            template = self.templates.get(domain)
+            stats["chars_before"] += len(doc.page_content)
+            if not template or canonical[domain] == doc.metadata["source"]:
+                stripped.append(doc)
+                stats["chars_after"] += len(doc.page_content)
+                continue
+            domains.add(domain)
+            lines = doc.page_content.splitlines()
+            kept = [line for line in lines if _normalize_line(line) not in template]
+            stats["lines_removed"] += len(lines) - len(kept)
+            content = "\n".join(kept)
+            stats["chars_after"] += len(content)
+            stripped.append(Document(page_content=content, metadata=doc.metadata))
+        stats["template_domains"] = len(domains)
+        return stripped, stats
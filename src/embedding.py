@@ -0,0 +1,253 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_MODEL = "mxbai-embed-large"
+HUGGINGFACE_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def create_embeddings(backend=None):
+    # Returns (embeddings, model name); EMBEDDINGS_BACKEND=huggingface selects the local CPU path
+    backend = backend or os.getenv("EMBEDDINGS_BACKEND", "ollama")
+    if backend == "huggingface":
+        from langchain.embeddings import HuggingFaceEmbeddings
+
+        embeddings = HuggingFaceEmbeddings(
+            model_name=HUGGINGFACE_MODEL,
+            model_kwargs={'device': 'cpu'},
+            encode_kwargs={'normalize_embeddings': False}
+        )
+        return embeddings, HUGGINGFACE_MODEL
+
+    from langchain_ollama import OllamaEmbeddings
+
+    embeddings = OllamaEmbeddings(
+        base_url=os.getenv("OLLAMA_URL"),
+        model=OLLAMA_MODEL
+    )
+    return embeddings, OLLAMA_MODEL
+
+
+class EmbeddingCache:
+    """SQLite-backed vector cache keyed by (model, text hash), evicting least recently used rows."""
+
+    def __init__(self, path, max_bytes):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS vectors ("
+            "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (model, text_hash))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_last_used ON vectors (last_used)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM vectors").fetchone()[0]
+
+    @staticmethod
+    def text_hash(text):
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def get_many(self, model, hashes):
+        found = {}
+        with self.lock:
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self.conn.execute(
+                    f"SELECT text_hash, vector FROM vectors WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = array('f', blob).tolist()
+            if found:
+                now = time.time()
+                self.conn.executemany(
+                    "UPDATE vectors SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found],
+                )
+                self.conn.commit()
+        return found
+
+    def put_many(self, model, items):
+        now = time.time()
+        rows = []
+        for text_hash, vector in items:
+            blob = array('f', vector).tobytes()
+            rows.append((model, text_hash, blob, len(blob), now))
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+            self.total_bytes += sum(row[3] for row in rows)
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Trim to 90% of the budget so eviction does not run on every insert
+        target = int(self.max_bytes * 0.9)
+        rows = self.conn.execute("SELECT model, text_hash, size FROM vectors ORDER BY last_used").fetchall()
+        victims = []
+        for model, text_hash, size in rows:
+            if self.total_bytes <= target:
+                break
+            victims.append((model, text_hash))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM vectors WHERE model = ? AND text_hash = ?", victims)
+        self.conn.commit()
+        logger.info(f"Evicted {len(victims)} cached embeddings")
+
+
+class EmbedStats:
+    def __init__(self):
+        self.requested = 0
+        self.cache_hits = 0
+        self.embedded = 0
+        self.batches = 0
+        self.seconds = 0.0
+
+    @property
+    def hit_rate(self):
+        return self.cache_hits / self.requested if self.requested else 0.0
+
+    @property
+    def throughput(self):
+        return self.requested / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            "requested": self.requested,
+            "cache_hits": self.cache_hits,
+            "hit_rate": round(self.hit_rate, 3),
+            "embedded": self.embedded,
+            "batches": self.batches,
+            "chunks_per_sec": round(self.throughput, 1),
+        }
+
+    def summary(self, unit="chunks"):
+        return (
+            f"{self.requested} {unit}, {self.hit_rate:.1%} cache hits, {self.embedded} embedded "
+            f"in {self.batches} batches, {self.throughput:.1f} {unit}/sec"
+        )
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an embeddings object with batching, bounded in-flight batches and a vector cache."""
+
+    def __init__(self, embeddings, model_name, cache=None, batch_size=32, max_in_flight=2):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        # One pool for all callers, so the refresh pipeline and the catalog build together
+        # never have more than max_in_flight batches at the model server
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="embed")
+        self.stats = EmbedStats()
+        # The refresh pipeline and the catalog build embed from different threads
+        self.stats_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        embeddings, model_name = create_embeddings()
+        cache_dir = os.getenv("EMBED_CACHE_DIR", "embedding_cache")
+        cache = None
+        if cache_dir:
+            max_bytes = int(float(os.getenv("EMBED_CACHE_MAX_MB", 512)) * 1024 * 1024)
+            cache = EmbeddingCache(os.path.join(cache_dir, "vectors.sqlite3"), max_bytes)
+        return cls(
+            embeddings,
+            model_name,
+            cache=cache,
+            batch_size=int(os.getenv("EMBED_BATCH_SIZE", 32)),
+            max_in_flight=int(os.getenv("EMBED_MAX_IN_FLIGHT", 2)),
+        )
+
+    def reset_stats(self):
+        with self.stats_lock:
+            stats, self.stats = self.stats, EmbedStats()
+        return stats
+
+    def embed_documents(self, texts, stats=None, stage="embed"):
+        # stats and stage keep other callers, such as the catalog build, out of the chunk figures
+        stats = self.stats if stats is None else stats
+        start = time.perf_counter()
+        hashes = [EmbeddingCache.text_hash(text) for text in texts]
+        cached = self.cache.get_many(self.model_name, list(set(hashes))) if self.cache else {}
+
+        # Embed each distinct missing text once
+        missing = {}
+        for text, text_hash in zip(texts, hashes):
+            if text_hash not in cached and text_hash not in missing:
+                missing[text_hash] = text
+        missing_items = list(missing.items())
+        batches = [missing_items[i:i + self.batch_size] for i in range(0, len(missing_items), self.batch_size)]
+
+        vectors = dict(cached)
+        if batches:
+            futures = [
+                self.executor.submit(self.embeddings.embed_documents, [text for _, text in batch])
+                for batch in batches
+            ]
+            try:
+                for batch, future in zip(batches, futures):
+                    batch_vectors = future.result()
+                    fresh = [(text_hash, vector) for (text_hash, _), vector in zip(batch, batch_vectors)]
+                    vectors.update(fresh)
+                    if self.cache:
+                        self.cache.put_many(self.model_name, fresh)
+            finally:
+                # After a failure the rest of this call's batches are not sent
+                for future in futures:
+                    future.cancel()
+
+        hits = sum(1 for text_hash in hashes if text_hash in cached)
+        elapsed = time.perf_counter() - start
+        with self.stats_lock:
+            stats.requested += len(texts)
+            stats.cache_hits += hits
+            stats.embedded += len(missing_items)
+            stats.batches += len(batches)
+            stats.seconds += elapsed
+        metrics.observe(stage, elapsed)
+        metrics.inc("embedded_texts", len(missing_items))
+        metrics.inc("embed_cache_hits", hits)
+        return [vectors[text_hash] for text_hash in hashes]
+
+    def embed_query(self, text):
+        with metrics.span("embed_query"):
+            return self.embeddings.embed_query(text)
+
+
+class QueryEmbeddings:
+    """Per-request memo over embed_query: the response cache, the catalog and dense retrieval
+    all ask for the question's vector, and the model is called once. A failure is remembered
+    as well and raised to every caller."""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.vectors = {}
+        self.errors = {}
+
+    def embed_query(self, text):
+        if text in self.errors:
+            raise self.errors[text]
+        if text not in self.vectors:
+            try:
+                self.vectors[text] = self.embeddings.embed_query(text)
+            except Exception as e:
+                self.errors[text] = e
+                raise
+        return self.vectors[text]
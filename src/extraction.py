@@ -0,0 +1,130 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Text nodes are joined one per line so menus and footers repeated across pages can be stripped
+LINE_SEPARATOR = '\n'
+# Tags whose contents BeautifulSoup's get_text leaves out; the faster backends drop them too
+NON_TEXT_TAGS = ('script', 'style', 'template')
+# Lazy-loading themes keep the real image here and put a placeholder in src
+IMAGE_ATTRIBUTES = ('data-src', 'data-original', 'data-lazy-src', 'data-srcset', 'srcset', 'src')
+
+
+def image_source(attributes):
+    # Returns the most likely real image URL of an <img>, skipping inline data: placeholders
+    for name in IMAGE_ATTRIBUTES:
+        value = (attributes.get(name) or '').strip()
+        if name.endswith('srcset'):
+            value = value.split(',')[0].strip().split(' ')[0]
+        if value and not value.startswith('data:'):
+            return value
+    return None
+
+
+def extract_bs4(html):
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    content = soup.get_text(separator=LINE_SEPARATOR, strip=True)
+    images = [src for src in (image_source(img.attrs) for img in soup.find_all('img')) if src]
+    return content, images
+
+
+def extract_lxml(html):
+    import lxml.html
+    from lxml import etree
+
+    if not html.strip():
+        return "", []
+    try:
+        tree = lxml.html.document_fromstring(html)
+    except etree.ParserError:
+        # Comment-only or empty-body documents; an empty page, not a failed fetch
+        return "", []
+    images = [src for src in (image_source(img.attrib) for img in tree.iter('img')) if src]
+    etree.strip_elements(tree, etree.Comment, *NON_TEXT_TAGS, with_tail=False)
+    content = LINE_SEPARATOR.join(text.strip() for text in tree.itertext() if text.strip())
+    return content, images
+
+
+def extract_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+
+    tree = LexborHTMLParser(html)
+    images = [src for src in (image_source(node.attributes) for node in tree.css('img')) if src]
+    tree.strip_tags(list(NON_TEXT_TAGS))
+    text = tree.root.text(separator=LINE_SEPARATOR, strip=True) if tree.root is not None else ""
+    # Whitespace-only text nodes come back as empty lines; the other backends leave them out
+    content = LINE_SEPARATOR.join(line for line in text.split(LINE_SEPARATOR) if line.strip())
+    return content, images
+
+
+BACKENDS = {
+    "bs4": extract_bs4,
+    "lxml": extract_lxml,
+    "selectolax": extract_selectolax,
+}
+
+
+def available_backends():
+    names = []
+    for name, module in (("bs4", "bs4"), ("lxml", "lxml.html"), ("selectolax", "selectolax.lexbor")):
+        try:
+            __import__(module)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+def resolve_backend(name):
+    # Fall back to BeautifulSoup when the requested parser is not installed
+    if name in BACKENDS and name in available_backends():
+        return name
+    if name != "bs4":
+        logger.warning(f"HTML parser backend '{name}' is not available, falling back to bs4")
+    return "bs4"
+
+
+def extract_page(html, backend):
+    return BACKENDS[backend](html)
+
+
+class PageExtractor:
+    """Runs HTML extraction in a process pool so parsing never blocks the crawler's event loop."""
+
+    def __init__(self, backend=None, workers=None):
+        self.backend = resolve_backend(backend or os.getenv("HTML_PARSER", "lxml"))
+        self.workers = workers or int(os.getenv("PARSER_WORKERS", 0)) or os.cpu_count() or 1
+        self.executor = None
+        logger.info(f"Using {self.backend} HTML parser with {self.workers} worker processes")
+
+    def _get_executor(self):
+        if self.executor is None:
+            # spawn instead of fork: the bot process runs scraping, Streamlit and Selenium threads
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+
+    async def extract(self, html):
+        loop = asyncio.get_running_loop()
+        try:
+            with metrics.span("parse"):
+                return await loop.run_in_executor(self._get_executor(), extract_page, html, self.backend)
+        except BrokenProcessPool:
+            logger.error("Parser process pool broke, recreating it and parsing this page with bs4")
+            self.executor = None
+            return await asyncio.to_thread(extract_bs4, html)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
@@ -0,0 +1,174 @@
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any
+
+from langchain_core.documents import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from indexer import chunk_id
+
+logger = logging.getLogger(__name__)
+
+# \w covers Urdu script as well as Latin product terms such as "khaddar" or "chiffon"
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# SKU-like tokens mix letters and digits, e.g. "ks24017" or "lwn-23-104" once split
+_SKU = re.compile(r"^(?=.*\d)(?=.*[a-z])[a-z\d]{4,}$")
+
+
+def tokenize(text):
+    return [token for token in _TOKEN.findall(text.lower()) if len(token) > 1 or token.isdigit()]
+
+
+class BM25Index:
+    """In-process inverted index with Okapi BM25 scoring that supports incremental add/remove."""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc id: term frequency}
+        self.doc_lengths = {}
+        self.docs = {}  # doc id -> (text, metadata)
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.docs)
+
+    def add(self, doc_id, text, metadata):
+        if doc_id in self.docs:
+            self.remove(doc_id)
+        tokens = tokenize(text)
+        for term, count in Counter(tokens).items():
+            self.postings[term][doc_id] = count
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        self.docs[doc_id] = (text, metadata)
+
+    def remove(self, doc_id):
+        entry = self.docs.pop(doc_id, None)
+        if entry is None:
+            return
+        for term in set(tokenize(entry[0])):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.doc_lengths.pop(doc_id)
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=20):
+        if not self.docs:
+            return []
+        avg_length = self.total_length / len(self.docs) or 1.0
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf(term)
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def document(self, doc_id):
+        text, metadata = self.docs[doc_id]
+        return Document(page_content=text, metadata=dict(metadata))
+
+    def is_lexical_query(self, query, max_terms=3, max_df_ratio=0.05):
+        # Short queries made only of rare indexed terms (brand names, SKUs, fabric words)
+        # are answered well by BM25 alone, which saves the query embedding call
+        terms = tokenize(query)
+        if not terms or not self.docs:
+            return False
+        if any(_SKU.match(term) and term in self.postings for term in terms):
+            return True
+        if len(terms) > max_terms:
+            return False
+        return all(0 < len(self.postings.get(term, ())) <= max_df_ratio * len(self.docs) for term in terms)
+
+    def copy(self):
+        clone = BM25Index(self.k1, self.b)
+        clone.postings = defaultdict(dict, {term: dict(postings) for term, postings in self.postings.items()})
+        clone.doc_lengths = dict(self.doc_lengths)
+        clone.docs = dict(self.docs)
+        clone.total_length = self.total_length
+        return clone
+
+    def to_dict(self):
+        # Postings are rebuilt on load, so only the documents are persisted
+        return {"k1": self.k1, "b": self.b, "docs": {doc_id: list(entry) for doc_id, entry in self.docs.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls(data.get("k1", 1.5), data.get("b", 0.75))
+        for doc_id, (text, metadata) in data["docs"].items():
+            index.add(doc_id, text, metadata)
+        return index
+
+    @classmethod
+    def from_vector_store(cls, vector_store):
+        data = vector_store.get(include=["documents", "metadatas"])
+        index = cls()
+        for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+            index.add(doc_id, text, metadata or {})
+        return index
+
+
+def reciprocal_rank_fusion(ranked_lists, k=60):
+    scores = defaultdict(float)
+    for ranked in ranked_lists:
+        for rank, doc_id in enumerate(ranked):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return [doc_id for doc_id, _ in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuses BM25 and dense results with reciprocal rank fusion.
+
+    mode is "hybrid", "dense" or "sparse"; in hybrid mode lexical-only queries skip the embedder.
+    invoke() accepts embed_query=... to reuse a vector the caller already computed for the query.
+    """
+
+    vector_store: Any
+    bm25: Any
+    k: int = 20
+    mode: str = "hybrid"
+    rrf_k: int = 60
+
+    def needs_embedding(self, query):
+        return self.mode == "dense" or (self.mode == "hybrid" and not self.bm25.is_lexical_query(query))
+
+    def _dense(self, query, k, embed_query=None):
+        ranked = []
+        docs = {}
+        if embed_query is not None:
+            results = self.vector_store.similarity_search_by_vector(embed_query(query), k=k)
+        else:
+            results = self.vector_store.similarity_search(query, k=k)
+        for doc in results:
+            doc_id = chunk_id(doc.metadata.get("source", ""), doc.page_content)
+            ranked.append(doc_id)
+            docs[doc_id] = doc
+        return ranked, docs
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun,
+                                embed_query=None):
+        candidates = self.k * 2
+        if self.mode == "dense":
+            ranked, docs = self._dense(query, self.k, embed_query)
+            return [docs[doc_id] for doc_id in ranked]
+
+        sparse = [doc_id for doc_id, _ in self.bm25.search(query, candidates)]
+        if self.mode == "sparse" or self.bm25.is_lexical_query(query):
+            return [self.bm25.document(doc_id) for doc_id in sparse[:self.k]]
+
+        dense, docs = self._dense(query, candidates, embed_query)
+        fused = reciprocal_rank_fusion([dense, sparse], self.rrf_k)[:self.k]
+        return [docs[doc_id] if doc_id in docs else self.bm25.document(doc_id) for doc_id in fused]
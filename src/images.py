@@ -0,0 +1,330 @@
+import hashlib
+import io
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+import urllib3
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Spacers, tracking pixels and theme placeholders rather than product photos
+_PLACEHOLDER = re.compile(r"(placeholder|spacer|blank|pixel|loader|lazy|1x1)[^/]*\.(gif|png|svg)$", re.IGNORECASE)
+_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".gif", ".avif")
+
+
+def _is_public_address(address):
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def _split_target(url):
+    # (scheme, host, port) of an http(s) URL that does not name localhost, else None
+    parsed = urlparse(url)
+    try:
+        host = (parsed.hostname or "").rstrip(".")
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    except ValueError:
+        return None
+    if parsed.scheme not in ("http", "https") or not host or host == "localhost" or host.endswith(".localhost"):
+        return None
+    return parsed.scheme, host, port
+
+
+def public_address(url):
+    # Scraped pages choose image URLs, so the proxy refuses loopback, private, link-local and
+    # reserved hosts; otherwise a page could point it at the metrics port or the internal network.
+    # Returns the checked address to connect to, or None.
+    target = _split_target(url)
+    if target is None:
+        return None
+    _, host, port = target
+    try:
+        return host if _is_public_address(host) else None
+    except ValueError:
+        pass  # a host name rather than an address
+    try:
+        addresses = [info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+    except (OSError, UnicodeError):
+        return None
+    if not addresses or not all(_is_public_address(address) for address in addresses):
+        return None
+    return addresses[0]
+
+
+def is_public_url(url):
+    # The check without DNS: literal addresses and localhost names only
+    target = _split_target(url)
+    if target is None:
+        return False
+    try:
+        return _is_public_address(target[1])
+    except ValueError:
+        return True
+
+
+def resolve_image_urls(page_url, sources, limit=20, width=600):
+    # Absolute, deduplicated product image URLs in page order
+    urls = []
+    seen = set()
+    for source in sources:
+        # Shopify themes leave the size as a template, e.g. products/1_{width}x.jpg
+        source = source.strip().replace("{width}", str(width))
+        url = urljoin(page_url, source)
+        parsed = urlparse(url)
+        if not is_public_url(url):
+            continue
+        path = parsed.path.lower()
+        if _PLACEHOLDER.search(path) or path.endswith(".svg"):
+            continue
+        if "." in path.rsplit("/", 1)[-1] and not path.endswith(_IMAGE_EXTENSIONS):
+            continue
+        # ?v= cache busters and size parameters do not make a different image
+        key = (parsed.netloc.lower(), parsed.path)
+        if key in seen:
+            continue
+        seen.add(key)
+        urls.append(url)
+        if len(urls) >= limit:
+            break
+    return urls
+
+
+def decode_image_urls(value):
+    # Metadata holds a list in memory, a JSON list in the vector store, or the old comma-joined string
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if value.startswith("["):
+        try:
+            return json.loads(value)
+        except ValueError:
+            pass
+    return [url.strip() for url in value.split(",") if url.strip()]
+
+
+class ThumbnailCache:
+    """Resized images on disk, evicted least recently used first once max_bytes is exceeded."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # file name -> size, least recently used first
+        self.total_bytes = 0
+        os.makedirs(directory, exist_ok=True)
+        files = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".jpg") and os.path.isfile(path):
+                files.append((os.path.getmtime(path), name, os.path.getsize(path)))
+        for _, name, size in sorted(files):
+            self.entries[name] = size
+            self.total_bytes += size
+
+    @staticmethod
+    def name(url):
+        return hashlib.sha256(url.encode('utf-8')).hexdigest() + ".jpg"
+
+    def get(self, url):
+        name = self.name(url)
+        with self.lock:
+            if name not in self.entries:
+                return None
+            self.entries.move_to_end(name)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            os.utime(path)  # recency survives restarts through the mtime
+            return data
+        except OSError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(name, 0)
+            return None
+
+    def put(self, url, data):
+        name = self.name(url)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+        evicted = []
+        with self.lock:
+            self.total_bytes += len(data) - self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                old_name, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                evicted.append(old_name)
+        for old_name in evicted:
+            try:
+                os.remove(os.path.join(self.directory, old_name))
+            except OSError:
+                pass
+
+
+class ImageProxy:
+    """Fetches remote product images once, with bounded concurrency, and serves local thumbnails.
+
+    Concurrent requests for the same URL share one download, and failed URLs are not retried
+    until failure_ttl has passed, so re-rendering chat history never goes back to the CDN.
+    """
+
+    def __init__(self, cache, size=320, max_concurrency=4, timeout=10, max_source_bytes=8 * 1024 * 1024,
+                 failure_ttl=3600):
+        self.cache = cache
+        self.size = size
+        self.timeout = timeout
+        self.max_source_bytes = max_source_bytes
+        self.failure_ttl = failure_ttl
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="image-proxy")
+        self.lock = threading.Lock()
+        self.in_flight = {}  # url -> Future
+        self.failed = OrderedDict()  # url -> time of the failure
+        self.local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        cache = ThumbnailCache(os.getenv("IMAGE_CACHE_DIR", "image_cache"),
+                               int(float(os.getenv("IMAGE_CACHE_MAX_MB", 256)) * 1024 * 1024))
+        return cls(cache, size=int(os.getenv("THUMBNAIL_SIZE", 320)),
+                   max_concurrency=int(os.getenv("IMAGE_FETCH_CONCURRENCY", 4)))
+
+    def _pool(self, scheme, host, port, address):
+        # Keep-alive pools per thread, keyed by the pinned address as well as the host
+        pools = getattr(self.local, "pools", None)
+        if pools is None or len(pools) >= 64:
+            for pool in (pools or {}).values():
+                pool.close()
+            pools = self.local.pools = {}
+        key = (scheme, host, port, address)
+        pool = pools.get(key)
+        if pool is None:
+            if scheme == "https":
+                # TLS still verifies the certificate against the host name, not the address
+                pool = urllib3.HTTPSConnectionPool(address, port, maxsize=1, server_hostname=host,
+                                                   assert_hostname=host, cert_reqs="CERT_REQUIRED",
+                                                   ca_certs=requests.certs.where())
+            else:
+                pool = urllib3.HTTPConnectionPool(address, port, maxsize=1)
+            pools[key] = pool
+        return pool
+
+    def _download(self, url):
+        from PIL import Image
+
+        try:
+            with metrics.span("image_fetch"):
+                body = self._fetch(url)
+            if len(body) > self.max_source_bytes:
+                raise ValueError(f"image larger than {self.max_source_bytes} bytes")
+            image = Image.open(io.BytesIO(body))
+            image.thumbnail((self.size, self.size))
+            output = io.BytesIO()
+            image.convert("RGB").save(output, format="JPEG", quality=80, optimize=True)
+            data = output.getvalue()
+            self.cache.put(url, data)
+            metrics.inc("image_fetches", result="ok")
+            return data
+        except Exception as e:
+            logger.warning(f"Could not fetch image {url}: {e}")
+            metrics.inc("image_fetches", result="failed")
+            with self.lock:
+                self.failed[url] = time.time()
+                while len(self.failed) > 10000:
+                    self.failed.popitem(last=False)
+            return None
+        finally:
+            with self.lock:
+                self.in_flight.pop(url, None)
+
+    def _fetch(self, url, max_redirects=5):
+        # Redirects are followed by hand so that every hop is checked, not just the scraped URL.
+        # Each connection goes to the address that passed the check, so a host that answers DNS
+        # differently the second time (rebinding) cannot redirect it to loopback.
+        for _ in range(max_redirects + 1):
+            address = public_address(url)
+            if address is None:
+                raise ValueError(f"refusing to fetch non-public address {url}")
+            scheme, host, port = _split_target(url)
+            parsed = urlparse(url)
+            host_header = f"[{host}]" if ":" in host else host
+            if parsed.port:
+                host_header += f":{parsed.port}"
+            headers = urllib3.make_headers(accept_encoding=True, user_agent=requests.utils.default_user_agent())
+            headers["Host"] = host_header
+            path = (parsed.path or "/") + (f"?{parsed.query}" if parsed.query else "")
+            response = self._pool(scheme, host, port, address).urlopen(
+                "GET", path, headers=headers, redirect=False, retries=False, preload_content=False,
+                timeout=self.timeout,
+            )
+            if response.status in (301, 302, 303, 307, 308) and response.headers.get("Location"):
+                response.drain_conn()
+                response.release_conn()
+                url = urljoin(url, response.headers["Location"])
+                continue
+            if response.status >= 400:
+                response.close()
+                raise ValueError(f"HTTP {response.status} for {url}")
+            chunks = []
+            size = 0
+            for chunk in response.stream(64 * 1024, decode_content=True):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > self.max_source_bytes:
+                    break
+            if size > self.max_source_bytes:
+                response.close()  # the rest of the body is never read, so the connection is not reused
+            else:
+                response.release_conn()
+            return b"".join(chunks)
+        raise ValueError(f"more than {max_redirects} redirects")
+
+    def _submit(self, url):
+        # Returns a cached thumbnail, None for a recent failure, or a Future for the download
+        data = self.cache.get(url)
+        if data is not None:
+            metrics.inc("image_cache_hits")
+            return data
+        with self.lock:
+            failed_at = self.failed.get(url)
+            if failed_at is not None and time.time() - failed_at < self.failure_ttl:
+                return None
+            future = self.in_flight.get(url)
+            if future is None:
+                future = self.in_flight[url] = self.executor.submit(self._download, url)
+        return future
+
+    def thumbnails(self, urls, timeout=None):
+        # Thumbnails in the order of urls, leaving out images that could not be fetched
+        pending = [self._submit(url) for url in urls]
+        results = []
+        for item in pending:
+            if hasattr(item, "result"):
+                try:
+                    item = item.result(timeout=timeout or self.timeout * 2)
+                except Exception:
+                    item = None
+            if item is not None:
+                results.append(item)
+        return results
+
+    def thumbnail(self, url):
+        results = self.thumbnails([url])
+        return results[0] if results else None
@@ -0,0 +1,64 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class IndexHandle:
+    """One complete, immutable generation of the index together with its retrievers."""
+
+    def __init__(self, generation, vector_store, retriever, bm25=None):
+        self.generation = generation
+        self.vector_store = vector_store
+        self.bm25 = bm25
+        self.retriever = retriever
+        # set.add / set.discard are atomic under the GIL, so readers never take a lock
+        self.readers = set()
+
+    def in_flight(self):
+        return len(self.readers)
+
+
+class IndexSlot:
+    """Holds the live IndexHandle; refreshes build a shadow handle and swap it in atomically."""
+
+    def __init__(self):
+        self.active = None
+
+    @contextmanager
+    def read(self):
+        # Yields the current handle (or None) and keeps it alive until the block exits
+        token = object()
+        while True:
+            handle = self.active
+            if handle is None:
+                yield None
+                return
+            handle.readers.add(token)
+            # A swap may have happened between the load and the add; retire() only waits for
+            # readers it can see, so re-check and move to the newer handle if needed
+            if handle is self.active:
+                break
+            handle.readers.discard(token)
+        try:
+            yield handle
+        finally:
+            handle.readers.discard(token)
+
+    def swap(self, handle):
+        previous, self.active = self.active, handle
+        return previous
+
+    @staticmethod
+    def drain(handle, timeout=60.0, poll_interval=0.05):
+        # Wait for queries still using a retired handle; returns False on timeout
+        deadline = time.monotonic() + timeout
+        while handle.in_flight():
+            if time.monotonic() >= deadline:
+                logger.warning(
+                    f"{handle.in_flight()} queries still using index generation {handle.generation}"
+                )
+                return False
+            time.sleep(poll_interval)
+        return True
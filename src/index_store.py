@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+STATE_FILE = "state.json"
+COLLECTION_NAME = "fashion_bot"
+
+
+def copy_collection(source, target, batch_size=1000):
+    # Copy ids, vectors, texts and metadata between Chroma stores without re-embedding anything
+    data = source.get(include=["embeddings", "documents", "metadatas"])
+    ids = data["ids"]
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        target._collection.add(
+            ids=ids[start:end],
+            embeddings=list(data["embeddings"][start:end]),
+            documents=data["documents"][start:end],
+            metadatas=data["metadatas"][start:end],
+        )
+
+
+def close_vector_store(vector_store):
+    # Chroma caches one system per persist directory for the life of the process; stop it and drop
+    # it from the cache so its files can be deleted and the path never gets a stale client.
+    # In-memory collections share a single system, which stays up.
+    from chromadb.api.shared_system_client import SharedSystemClient
+
+    client = vector_store._client
+    if not client.get_settings().is_persistent:
+        return
+    system = SharedSystemClient._identifier_to_system.pop(client._identifier, None)
+    if system is not None:
+        system.stop()
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class IndexStore:
+    """On-disk home of the vector store.
+
+    Every refresh writes a new generation directory (a copy of the live one plus the diff),
+    and manifest.json is atomically repointed at it once it is complete. A crash mid-refresh
+    therefore leaves the previous snapshot intact.
+    """
+
+    def __init__(self, directory, embedding_model):
+        self.directory = directory
+        self.embedding_model = embedding_model
+        self.snapshots_dir = os.path.join(directory, "snapshots")
+        self.last_generation = 0  # highest number handed out by this process
+        os.makedirs(self.snapshots_dir, exist_ok=True)
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_FILE)
+
+    def read_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Unreadable manifest: {e}")
+
+    def snapshot_path(self, generation):
+        return os.path.join(self.snapshots_dir, f"gen-{generation:06d}")
+
+    def load(self):
+        # Returns (generation, path, state) for the published snapshot, or None for a cold start
+        manifest = self.read_manifest()
+        if manifest is None:
+            return None
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format {manifest.get('format_version')}")
+        if manifest.get("embedding_model") != self.embedding_model:
+            raise SnapshotError(
+                f"Snapshot was built with {manifest.get('embedding_model')}, not {self.embedding_model}"
+            )
+
+        generation = manifest["generation"]
+        path = self.snapshot_path(generation)
+        try:
+            with open(os.path.join(path, STATE_FILE), 'rb') as file:
+                raw_state = file.read()
+        except OSError as e:
+            raise SnapshotError(f"Missing snapshot state for generation {generation}: {e}")
+        if hashlib.sha256(raw_state).hexdigest() != manifest.get("checksum"):
+            raise SnapshotError(f"Checksum mismatch for generation {generation}")
+
+        return generation, path, json.loads(raw_state)
+
+    def verify_collection(self, vector_store, state):
+        # Chunk ids are content hashes, so matching id sets means matching contents
+        expected = {cid for ids in state["indexer"]["page_chunks"].values() for cid in ids}
+        stored = set(vector_store.get(include=[])["ids"])
+        if stored != expected:
+            raise SnapshotError(
+                f"Collection has {len(stored)} chunks, snapshot state expects {len(expected)}"
+            )
+
+    def generations(self):
+        numbers = []
+        for name in os.listdir(self.snapshots_dir):
+            if name.startswith("gen-") and name[4:].isdigit():
+                numbers.append(int(name[4:]))
+        return numbers
+
+    def new_generation(self, base_generation):
+        # Copy the live snapshot so the refresh can write while queries keep reading the old one.
+        # Numbers are never reused, not even those of discarded refreshes
+        manifest = self.read_manifest() or {}
+        generation = max([base_generation or 0, manifest.get("generation", 0), self.last_generation,
+                          *self.generations()]) + 1
+        self.last_generation = generation
+        path = self.snapshot_path(generation)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        if base_generation is not None and os.path.isdir(self.snapshot_path(base_generation)):
+            shutil.copytree(self.snapshot_path(base_generation), path)
+        else:
+            os.makedirs(path)
+        return generation, path
+
+    def publish(self, generation, state):
+        path = self.snapshot_path(generation)
+        raw_state = json.dumps(state, sort_keys=True).encode('utf-8')
+        with open(os.path.join(path, STATE_FILE), 'wb') as file:
+            file.write(raw_state)
+            file.flush()
+            os.fsync(file.fileno())
+
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "generation": generation,
+            "embedding_model": self.embedding_model,
+            "collection_name": COLLECTION_NAME,
+            "checksum": hashlib.sha256(raw_state).hexdigest(),
+            "created_at": time.time(),
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        logger.info(f"Published index snapshot generation {generation}")
+
+    def discard(self, generation):
+        shutil.rmtree(self.snapshot_path(generation), ignore_errors=True)
+
+    def prune(self, keep):
+        # Remove every generation except the ones still referenced
+        keep_names = {f"gen-{generation:06d}" for generation in keep if generation is not None}
+        for name in os.listdir(self.snapshots_dir):
+            if name not in keep_names:
+                shutil.rmtree(os.path.join(self.snapshots_dir, name), ignore_errors=True)
+
+    def generation_size(self, generation):
+        # Bytes on disk for one snapshot generation
+        total = 0
+        for directory, _, files in os.walk(self.snapshot_path(generation)):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(directory, name))
+                except OSError:
+                    pass
+        return total
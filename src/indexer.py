@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+
+from langchain_core.documents import Document
+
+from dedup import SimHashIndex, simhash
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def chunk_id(url, text):
+    # Stable id so an unchanged chunk maps to the same vector store entry across cycles
+    return content_hash(f"{url}\n{text}")[:40]
+
+
+def storable(doc):
+    # Chroma only takes scalar metadata, so lists such as image_urls are stored as JSON
+    metadata = {key: json.dumps(value) if isinstance(value, (list, tuple)) else value
+                for key, value in doc.metadata.items()}
+    return Document(page_content=doc.page_content, metadata=metadata)
+
+
+@dataclass
+class IndexDiff:
+    added_ids: list = field(default_factory=list)
+    removed_ids: list = field(default_factory=list)
+    pages: dict = field(default_factory=dict)      # url -> (page hash, chunk ids, duplicate targets)
+    signatures: dict = field(default_factory=dict)  # chunk id -> SimHash for chunks of changed pages
+    removed_urls: list = field(default_factory=list)
+    unchanged_pages: int = 0
+    changed_pages: int = 0
+    removed_pages: int = 0
+    new_chunks: int = 0            # chunks of changed pages before near-duplicate removal
+    duplicate_chunks: int = 0      # of those, dropped as near-duplicates of indexed chunks
+
+
+class IncrementalIndexer:
+    """Tracks a content hash per page and per chunk so refreshes only touch what changed.
+
+    With max_distance set, a chunk whose SimHash is within that many bits of a chunk already in
+    the index is dropped before it reaches the embedder.
+    """
+
+    def __init__(self, text_splitter, max_distance=None):
+        if max_distance is not None:
+            SimHashIndex(max_distance)  # rejects a distance the band lookup cannot guarantee
+        self.text_splitter = text_splitter
+        self.max_distance = max_distance
+        self.page_hashes = {}  # url -> hash of the page content
+        self.page_chunks = {}  # url -> list of chunk ids currently in the index
+        self.chunk_signatures = {}  # chunk id -> SimHash
+        self.page_duplicates = {}  # url -> chunk ids (on other pages) its dropped chunks duplicated
+
+    def state_after(self, diff):
+        # Serializable indexer state as it will be once the diff is committed
+        page_hashes = dict(self.page_hashes)
+        page_chunks = dict(self.page_chunks)
+        page_duplicates = dict(self.page_duplicates)
+        for url in diff.removed_urls:
+            page_hashes.pop(url, None)
+            page_chunks.pop(url, None)
+            page_duplicates.pop(url, None)
+        for url, (page_hash, ids, duplicates) in diff.pages.items():
+            page_hashes[url] = page_hash
+            page_chunks[url] = ids
+            page_duplicates[url] = duplicates
+        removed = set(diff.removed_ids)
+        chunk_signatures = {cid: signature for cid, signature in self.chunk_signatures.items() if cid not in removed}
+        chunk_signatures.update(diff.signatures)
+        return {"page_hashes": page_hashes, "page_chunks": page_chunks,
+                "page_duplicates": {url: ids for url, ids in page_duplicates.items() if ids},
+                "chunk_signatures": chunk_signatures}
+
+    def load_state(self, state):
+        self.page_hashes = dict(state["page_hashes"])
+        self.page_chunks = {url: list(ids) for url, ids in state["page_chunks"].items()}
+        # Snapshots written before near-duplicate detection have no signatures yet
+        self.page_duplicates = {url: list(ids) for url, ids in state.get("page_duplicates", {}).items()}
+        self.chunk_signatures = dict(state.get("chunk_signatures", {}))
+
+    def commit(self, diff):
+        # Record the state the index now reflects; call only after the diff was applied
+        self.load_state(self.state_after(diff))
+
+
+class IndexPlanner:
+    """Plans one refresh page by page, so chunks can be embedded while other pages are still fetched.
+
+    Which pages disappeared is only known once every page was seen, so a page whose dropped chunks
+    duplicated a chunk that leaves the index later in the cycle is split again in finish(); its
+    content does not disappear with the other page.
+    """
+
+    def __init__(self, indexer):
+        self.indexer = indexer
+        self.diff = IndexDiff()
+        self.seen = set()
+        self.retained = {}  # url -> document, for pages whose chunks were dropped as duplicates
+        self.leaving = set()
+        self.index = None
+        if indexer.max_distance is not None:
+            self.index = SimHashIndex(indexer.max_distance)
+            for cid, signature in indexer.chunk_signatures.items():
+                self.index.add(cid, signature)
+
+    def add(self, doc):
+        # Returns the (chunk id, chunk) pairs of this page to embed and the chunk ids to delete
+        url = doc.metadata["source"]
+        if url in self.seen:
+            return [], []
+        self.seen.add(url)
+        page_hash = content_hash(doc.page_content)
+        if self.indexer.page_hashes.get(url) == page_hash:
+            self.diff.unchanged_pages += 1
+            if self.indexer.page_duplicates.get(url):
+                self.retained[url] = doc
+            return [], []
+
+        self.diff.changed_pages += 1
+        old_ids = self.indexer.page_chunks.get(url, [])
+        if self.index is not None:
+            for cid in old_ids:
+                self.index.remove(cid)
+        added, new_ids, duplicates = self._split(url, doc, set(old_ids), kept=())
+        removed = [cid for cid in old_ids if cid not in set(new_ids)]
+        self.leaving.update(removed)
+        self.diff.removed_ids.extend(removed)
+        self.diff.pages[url] = (page_hash, new_ids, duplicates)
+        if duplicates:
+            self.retained[url] = doc
+        return added, removed
+
+    def finish(self, keep_urls=()):
+        # keep_urls are pages that failed transiently this cycle; their chunks stay indexed
+        removed = []
+        for url in list(self.indexer.page_hashes):
+            if url not in self.seen and url not in keep_urls:
+                self.diff.removed_pages += 1
+                self.diff.removed_urls.append(url)
+                removed.extend(self.indexer.page_chunks.get(url, []))
+        self.leaving.update(removed)
+        self.diff.removed_ids.extend(removed)
+        if self.index is not None:
+            for cid in removed:
+                self.index.remove(cid)
+
+        added = []
+        for url, doc in self.retained.items():
+            if url in self.diff.pages:
+                page_hash, ids, duplicates = self.diff.pages[url]
+            else:
+                page_hash, ids, duplicates = (self.indexer.page_hashes[url], self.indexer.page_chunks.get(url, []),
+                                              self.indexer.page_duplicates[url])
+            if not self.leaving.intersection(duplicates):
+                continue
+            if url not in self.diff.pages:
+                self.diff.unchanged_pages -= 1
+                self.diff.changed_pages += 1
+            # Chunks already indexed stay; only the dropped ones are checked again
+            page_added, new_ids, duplicates = self._split(url, doc, set(ids), kept=set(ids),
+                                                          counted=url in self.diff.pages)
+            added.extend(page_added)
+            self.diff.pages[url] = (page_hash, new_ids, duplicates)
+        return added, removed
+
+    def _split(self, url, doc, old_ids, kept, counted=False):
+        # counted: the page's chunks were already counted in this cycle's stats
+        added = []
+        new_ids = []
+        new_id_set = set()
+        duplicates = []
+        for chunk in self.indexer.text_splitter.split_documents([doc]):
+            cid = chunk_id(url, chunk.page_content)
+            if cid in new_id_set:
+                continue
+            if not counted:
+                self.diff.new_chunks += 1
+            if cid not in kept and self.index is not None:
+                signature = self.diff.signatures.get(cid) or self.indexer.chunk_signatures.get(cid)
+                if signature is None:
+                    signature = simhash(chunk.page_content)
+                match = self.index.find(signature)
+                if match is not None:
+                    if not counted:
+                        self.diff.duplicate_chunks += 1
+                    duplicates.append(match)
+                    continue
+                self.index.add(cid, signature)
+                self.diff.signatures[cid] = signature
+                if counted:
+                    self.diff.duplicate_chunks -= 1
+            new_ids.append(cid)
+            new_id_set.add(cid)
+            if cid not in old_ids:
+                chunk.metadata["content_hash"] = content_hash(chunk.page_content)
+                added.append((cid, chunk))
+                self.diff.added_ids.append(cid)
+        return added, new_ids, sorted(set(duplicates))
@@ -1,126 +1,372 @@
 import os
-import requests
 import asyncio
-import aiohttp
-from bs4 import BeautifulSoup
-from langchain_ollama import OllamaEmbeddings
-from langchain.embeddings import HuggingFaceEmbeddings
 from langchain.vectorstores import Chroma
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.chains import ConversationalRetrievalChain
 from langchain_groq import ChatGroq
-from langchain.memory import ConversationBufferMemory
 from langchain.prompts import (
     ChatPromptTemplate,
     SystemMessagePromptTemplate,
     HumanMessagePromptTemplate,
 )
-from dotenv import load_dotenv
+from catalog import CatalogBuilder, ProductCatalog, match_brands, match_colors
+from crawler import Crawler, CrawlerConfig
+from dedup import BoilerplateStripper
+from embedding import CachedEmbeddings, EmbedStats, QueryEmbeddings
+from hybrid import BM25Index, HybridRetriever
+from images import decode_image_urls, resolve_image_urls
+from extraction import PageExtractor
+from indexer import IncrementalIndexer, IndexPlanner
+from metrics import metrics
+from pipeline import RefreshPipeline
+from response_cache import ResponseCache
+from session_memory import SessionMemoryStore, WindowedMemory
+from url_registry import URLRegistry
+from index_handle import IndexHandle, IndexSlot
+from index_store import IndexStore, SnapshotError, COLLECTION_NAME, close_vector_store, copy_collection
 import threading
 import time
 import logging
+from urllib.parse import urlparse
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG,
-                    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                    filename='fashion_bot.log',
-                    filemode='w')
-
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-console_handler.setFormatter(formatter)
-logging.getLogger('').addHandler(console_handler)
-
+# Logging and .env loading happen in services.bootstrap(); importing this module has no side effects
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-
-API_KEY = os.getenv("GROQ_API_KEY")
-os.environ["TOKENIZERS_PARALLELISM"] = "false"
-
 class FashionBot:
     def __init__(self):
-        self.documents = []
-        self.vector_store = None
-        self.llm = ChatGroq(temperature=0, groq_api_key=API_KEY, model_name="llama3-70b-8192")
-        self.retriever = None
-        self.memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-        self.conversation = None
-        self.data_fetching = False
-        self.first_fetch = True
+        self.failed_urls = set()
+        # Brand sites from urls.txt, kept in memory and reloaded when the file changes
+        self.url_registry = URLRegistry()
+        # Queries read whichever index generation is live; refreshes build the next one on the side
+        self.index = IndexSlot()
+        self.retired = []  # replaced generations not yet released
+        self.drain_timeout = float(os.getenv("INDEX_DRAIN_TIMEOUT", 10))
+        # Ollama by default; EMBEDDINGS_BACKEND=huggingface switches to the local CPU model
+        self.embeddings = CachedEmbeddings.from_env()
+        self.embedding_model = self.embeddings.model_name
+        self.last_embed_stats = None
+        self.last_catalog_embed_stats = None
+        # Answers are cached per index generation; a refresh invalidates them
+        self.response_cache = ResponseCache.from_env(facets=self.question_facets)
+        # hybrid (default), dense or sparse
+        self.retrieval_mode = os.getenv("RETRIEVAL_MODE", "hybrid")
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=128)
+        # Near-duplicate chunks (SimHash within NEAR_DUPLICATE_DISTANCE bits) are never embedded;
+        # a negative distance turns the check off
+        max_distance = int(os.getenv("NEAR_DUPLICATE_DISTANCE", 3))
+        self.indexer = IncrementalIndexer(self.text_splitter, max_distance if max_distance >= 0 else None)
+        # Menus, banners and footers repeated across a brand's pages are dropped before splitting
+        self.boilerplate = BoilerplateStripper(
+            min_pages=int(os.getenv("BOILERPLATE_MIN_PAGES", 3)),
+            min_ratio=float(os.getenv("BOILERPLATE_MIN_RATIO", 0.5)),
+        )
+        self.last_dedup_stats = None
+        # Sites waiting between refresh stages; together with the crawl concurrency this caps memory
+        self.pipeline_queue_size = int(os.getenv("PIPELINE_QUEUE_SIZE", 4))
+        self.write_batch_size = int(os.getenv("INDEX_WRITE_BATCH", 256))
+        self.last_pipeline_stats = None
+
+        # Persistent index; set VECTOR_STORE_DIR to an empty value to keep the index in memory only
+        store_dir = os.getenv("VECTOR_STORE_DIR", "vector_store")
+        self.index_store = IndexStore(store_dir, self.embedding_model) if store_dir else None
+
+        self.llm = ChatGroq(temperature=0, groq_api_key=os.getenv("GROQ_API_KEY"), model_name="llama3-70b-8192")
+        # Per-session chat history, trimmed to a turn window and token budget
+        self.sessions = SessionMemoryStore()
+        self.answer_prompt = self.setup_answer_prompt()
         self.fetch_interval = 3600  # 1 hour in seconds
+        self.crawler_config = CrawlerConfig.from_env()
+        self.extractor = PageExtractor()
+        self.last_crawl_stats = None
+        # Structured product records used to pre-filter by brand, color and price
+        self.catalog_path = os.getenv("CATALOG_PATH", "catalog/products.npz")
+        self.catalog = ProductCatalog.load(self.catalog_path)
+        self.catalog_version = 0  # bumped on every swap; cached answers quote catalog prices
+        self.catalog_builder = CatalogBuilder()
+        self.last_scrape_at = None
+        metrics.set_gauge("scrape_cycle_age_seconds",
+                          lambda: time.time() - self.last_scrape_at if self.last_scrape_at else None)
+        self.load_snapshot()
         logger.info("FashionBot initialized")
 
+    @property
+    def vector_store(self):
+        handle = self.index.active
+        return handle.vector_store if handle else None
+
+    @property
+    def retriever(self):
+        handle = self.index.active
+        return handle.retriever if handle else None
+
+    def make_index_handle(self, generation, vector_store, bm25):
+        retriever = HybridRetriever(vector_store=vector_store, bm25=bm25, k=20, mode=self.retrieval_mode)
+        return IndexHandle(generation, vector_store, retriever, bm25)
+
+    def open_vector_store(self, path):
+        return Chroma(
+            collection_name=COLLECTION_NAME,
+            embedding_function=self.embeddings,
+            persist_directory=path,
+        )
+
+    def load_snapshot(self):
+        # Warm start: serve the last published snapshot before the first scrape finishes
+        if self.index_store is None:
+            return
+        start = time.perf_counter()
+        vector_store = None
+        try:
+            snapshot = self.index_store.load()
+            if snapshot is None:
+                logger.info("No index snapshot found, starting cold")
+                return
+            generation, path, state = snapshot
+            vector_store = self.open_vector_store(path)
+            self.index_store.verify_collection(vector_store, state)
+        except SnapshotError as e:
+            logger.warning(f"Ignoring index snapshot: {e}")
+            if vector_store is not None:
+                close_vector_store(vector_store)
+            return
+        except Exception as e:
+            logger.exception(f"Failed to open index snapshot: {e}")
+            return
+
+        if "bm25" in state:
+            bm25 = BM25Index.from_dict(state["bm25"])
+        else:
+            bm25 = BM25Index.from_vector_store(vector_store)
+        self.indexer.load_state(state["indexer"])
+        self.index.swap(self.make_index_handle(generation, vector_store, bm25))
+        self.record_index_gauges()
+        logger.info(
+            f"Loaded index snapshot generation {generation} with {len(state['indexer']['page_hashes'])} pages "
+            f"in {time.perf_counter() - start:.2f}s"
+        )
+
     def get_urls(self):
-        logger.info("Reading URLs from file")
-        with open('urls.txt', 'r') as file:
-            urls = file.read().splitlines()
-        return urls
+        return self.url_registry.urls()
 
     async def scrape_data_from_urls(self, urls):
-        self.data_fetching = True
         logger.info("Starting data scraping")
-        async with aiohttp.ClientSession() as session:
-            tasks = [self.fetch_content(session, url) for url in urls]
-            await asyncio.gather(*tasks)
-        self.prepare_vector_store()
-        self.data_fetching = False
-        self.first_fetch = False
+        # Each cycle starts from an empty page set; the indexer diffs it against what is already indexed
+        self.failed_urls = set()
+        base = self.index.active
+        pipeline = self.start_refresh(base)
+        try:
+            async with Crawler(self.crawler_config) as crawler:
+                await asyncio.gather(self.crawl_sites(crawler, urls, pipeline), self.refresh_catalog(crawler, urls))
+            diff = await asyncio.to_thread(pipeline.close, self.failed_urls)
+        except Exception:
+            # A failed refresh leaves the live generation alone and drops what it wrote so far
+            await asyncio.to_thread(pipeline.abort)
+            self.discard_refresh(pipeline)
+            raise
+        self.last_crawl_stats = crawler.stats.as_dict()
+        logger.info(f"Crawl stats: {crawler.stats.summary()}")
+        self.last_scrape_at = time.time()
+        metrics.inc("scrape_cycles")
+        metrics.set_gauge("documents", pipeline.pages)
+        metrics.set_gauge("failed_urls", len(self.failed_urls))
+        # Publishing and releasing the old generation block, so they run off the event loop
+        await asyncio.to_thread(self.finish_refresh, base, pipeline, diff)
         logger.info("Data scraping completed")
 
-    async def fetch_content(self, session, url):
+    async def crawl_sites(self, crawler, urls, pipeline):
+        # Pages are handed on one site at a time, since boilerplate is learned per site
+        sites = {}
+        for url in urls:
+            sites.setdefault(urlparse(url).netloc, []).append(url)
+        limit = asyncio.Semaphore(self.crawler_config.max_concurrency)
+
+        async def crawl_site(site_urls):
+            async with limit:
+                pages = await asyncio.gather(*(self.fetch_content(crawler, url) for url in site_urls))
+                documents = [doc for doc in pages if doc is not None]
+                if documents:
+                    await pipeline.put(documents)
+
+        await asyncio.gather(*(crawl_site(site_urls) for site_urls in sites.values()))
+
+    async def refresh_catalog(self, crawler, urls):
+        # Counted apart from the refresh's chunk embedding, which it runs alongside
+        embed_stats = EmbedStats()
+        try:
+            catalog = await self.catalog_builder.build(
+                crawler, urls,
+                lambda texts: self.embeddings.embed_documents(texts, stats=embed_stats, stage="catalog_embed"),
+            )
+        except Exception as e:
+            logger.exception(f"An error occurred while building the product catalog: {e}")
+            return
+        self.last_catalog_embed_stats = embed_stats.as_dict()
+        logger.info(f"Catalog embedding stats: {embed_stats.summary('products')}")
+        if len(catalog) and catalog.digest() != self.catalog.digest():
+            # Swapped by reference, like the vector index; an identical rebuild keeps cached answers
+            self.catalog = catalog
+            self.catalog_version += 1
+            await asyncio.to_thread(catalog.save, self.catalog_path)
+
+    async def fetch_content(self, crawler, url):
+        # Returns the page as a Document, or None when it failed or has too little text
         try:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    text = await response.text()
-                    soup = BeautifulSoup(text, 'html.parser')
-
-                    # Extracting text content
-                    content = soup.get_text(separator=' ', strip=True)
-
-                    # Extracting image URLs
-                    images = [img['src'] for img in soup.find_all('img') if img.get('src')]
-                    image_urls = ", ".join(images)
-
-                    if len(content) > 500:
-                        self.documents.append(Document(page_content=content, metadata={"source": url, "image_urls": image_urls}))
-                        logger.debug(f"Content and images fetched from {url}")
-                    else:
-                        logger.warning(f"Content from {url} is too short to be useful.")
-                else:
-                    logger.error(f"Failed to retrieve content from {url}, status code: {response.status}")
+            result = await crawler.fetch(url)
+            if result is None:
+                self.failed_urls.add(url)
+                logger.error(f"Failed to retrieve content from {url} after retries")
+            elif result.status == 200:
+                # Extracting text content and image URLs off the event loop
+                content, images = await self.extractor.extract(result.text)
+                # Absolute, deduplicated and without lazy-load placeholders, stored as a list
+                image_urls = resolve_image_urls(url, images)
+
+                if len(content) > 500:
+                    logger.debug(f"Content and images fetched from {url}")
+                    return Document(page_content=content, metadata={"source": url, "image_urls": image_urls})
+                logger.warning(f"Content from {url} is too short to be useful.")
+            else:
+                if result.status >= 500 or result.status == 429:
+                    self.failed_urls.add(url)
+                logger.error(f"Failed to retrieve content from {url}, status code: {result.status}")
         except Exception as e:
+            self.failed_urls.add(url)
             logger.exception(f"An error occurred while fetching {url}: {e}")
-
-    def prepare_vector_store(self):
-        logger.info("Preparing vector store")
-        embeddings = OllamaEmbeddings(
-            base_url=os.getenv("OLLAMA_URL"),
-            model="mxbai-embed-large"
+        return None
+
+    def start_refresh(self, base):
+        # Chunks are embedded and written into the next generation while the crawl is still running
+        self.embeddings.reset_stats()
+        pipeline = RefreshPipeline(
+            IndexPlanner(self.indexer),
+            self.boilerplate,
+            self.embeddings,
+            lambda: self.open_generation(base),
+            queue_size=self.pipeline_queue_size,
+            embed_batch_size=self.embeddings.batch_size * self.embeddings.max_in_flight,
+            write_batch_size=self.write_batch_size,
+        )
+        return pipeline.start()
+
+    def finish_refresh(self, base, pipeline, diff):
+        self.last_pipeline_stats = pipeline.as_dict()
+        logger.info(f"Refresh pipeline: {pipeline.summary()}")
+        self.record_dedup_stats(pipeline.boilerplate_stats, diff)
+        logger.info(
+            f"Index diff: {diff.changed_pages} changed, {diff.unchanged_pages} unchanged, "
+            f"{diff.removed_pages} removed pages; {len(diff.added_ids)} chunks embedded, "
+            f"{len(diff.removed_ids)} chunks deleted"
+        )
+        embed_stats = self.embeddings.reset_stats()
+        self.last_embed_stats = embed_stats.as_dict()
+        logger.info(f"Embedding stats: {embed_stats.summary()}")
+
+        if pipeline.target is None and base is not None:
+            # Nothing was written, so no new generation was opened
+            self.indexer.commit(diff)
+            logger.info("Vector store is up to date")
+            return
+        if pipeline.target is None:
+            pipeline.target = self.open_generation(base)
+
+        generation, vector_store, bm25 = pipeline.target
+        if self.index_store is not None:
+            try:
+                self.index_store.publish(generation, {"indexer": self.indexer.state_after(diff), "bm25": bm25.to_dict()})
+            except Exception:
+                self.discard_refresh(pipeline)
+                raise
+        previous = self.index.swap(self.make_index_handle(generation, vector_store, bm25))
+        self.indexer.commit(diff)
+        if previous is not None:
+            self.retire_index(previous)
+        self.record_index_gauges()
+        logger.info(f"Vector store prepared, serving generation {generation}")
+
+    def open_generation(self, base):
+        # A copy of the live index for the refresh to write into; queries keep using `base` meanwhile
+        bm25 = base.bm25.copy() if base else BM25Index()
+        if self.index_store is not None:
+            generation, path = self.index_store.new_generation(base.generation if base else None)
+            return generation, self.open_vector_store(path), bm25
+        # Every in-memory generation gets its own collection so the live one is never written to
+        generation = (base.generation if base else 0) + 1
+        vector_store = Chroma(
+            collection_name=f"{COLLECTION_NAME}_{generation}",
+            embedding_function=self.embeddings,
+        )
+        if base is not None:
+            copy_collection(base.vector_store, vector_store)
+        return generation, vector_store, bm25
+
+    def discard_refresh(self, pipeline):
+        if pipeline.target is None:
+            return
+        generation, vector_store, _ = pipeline.target
+        if self.index_store is not None:
+            # The cached client would otherwise keep writing to the deleted database file
+            close_vector_store(vector_store)
+            self.index_store.discard(generation)
+        else:
+            vector_store.delete_collection()
+
+    def record_dedup_stats(self, boilerplate_stats, diff):
+        # A refresh that yielded no pages has no boilerplate stats
+        boilerplate_stats = {"pages": 0, "template_domains": 0, "lines_removed": 0, "chars_before": 0,
+                             "chars_after": 0, **boilerplate_stats}
+        batch_size = self.embeddings.batch_size
+        batches = -(-diff.new_chunks // batch_size) - -(-(diff.new_chunks - diff.duplicate_chunks) // batch_size)
+        chars_before = boilerplate_stats["chars_before"]
+        self.last_dedup_stats = {
+            **boilerplate_stats,
+            "boilerplate_ratio": round(1 - boilerplate_stats["chars_after"] / chars_before, 3) if chars_before else 0.0,
+            "new_chunks": diff.new_chunks,
+            "duplicate_chunks": diff.duplicate_chunks,
+            "embeddings_saved": diff.duplicate_chunks,
+            "embedding_batches_saved": batches,
+        }
+        metrics.inc("boilerplate_lines_removed", boilerplate_stats["lines_removed"])
+        metrics.inc("duplicate_chunks_dropped", diff.duplicate_chunks)
+        logger.info(
+            f"Dedup stats: {boilerplate_stats['lines_removed']} boilerplate lines removed "
+            f"({self.last_dedup_stats['boilerplate_ratio']:.0%} of text) on {boilerplate_stats['template_domains']} "
+            f"domains; {diff.duplicate_chunks} of {diff.new_chunks} new chunks dropped as near-duplicates, "
+            f"saving {diff.duplicate_chunks} embeddings in ~{batches} fewer batch calls"
         )
 
-        # embeddings = HuggingFaceEmbeddings(
-        #     model_name="sentence-transformers/all-MiniLM-L6-v2",
-        #     model_kwargs={'device': 'cpu'},
-        #     encode_kwargs={'normalize_embeddings': False}
-        # )
-
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=128)
-        chunks = text_splitter.split_documents(self.documents)
-
-        for i, chunk in enumerate(chunks[:5]):
-            logger.debug(f"Chunk {i} from {chunk.metadata['source']}:\n{chunk.page_content[:500]}...")
-
-        self.vector_store = Chroma.from_documents(chunks, embeddings)
-        self.retriever = self.vector_store.as_retriever(k=20)
-        self.setup_conversation_chain()
-        self.data_fetching = False
-        logger.info("Vector store prepared")
-
-    def setup_conversation_chain(self):
-        logger.info("Setting up conversation chain")
+    def record_index_gauges(self):
+        handle = self.index.active
+        if handle is None:
+            return
+        metrics.set_gauge("index_generation", handle.generation)
+        metrics.set_gauge("chunks", len(handle.bm25))
+        metrics.set_gauge("indexed_pages", len(self.indexer.page_hashes))
+        if self.index_store is not None:
+            metrics.set_gauge("index_bytes", self.index_store.generation_size(handle.generation))
+
+    def retire_index(self, handle):
+        self.retired.append(handle)
+        self.release_retired()
+
+    def release_retired(self):
+        # Old generations are released once the queries still holding them have finished; one that
+        # is still in use after drain_timeout is kept and tried again after the next refresh
+        in_use = []
+        for handle in self.retired:
+            if not IndexSlot.drain(handle, timeout=self.drain_timeout):
+                in_use.append(handle)
+                continue
+            if self.index_store is not None:
+                close_vector_store(handle.vector_store)
+            else:
+                handle.vector_store.delete_collection()
+            logger.info(f"Released index generation {handle.generation}")
+        self.retired = in_use
+        if self.index_store is not None:
+            self.index_store.prune(keep=[self.index.active.generation, *(handle.generation for handle in in_use)])
+
+    def setup_answer_prompt(self):
+        logger.info("Setting up answer prompt")
 
         general_system_template = """
         You are a helpful assistant with extensive knowledge about fashion brands and products. Your responses should:
@@ -149,56 +395,140 @@ class FashionBot:
             SystemMessagePromptTemplate.from_template(general_system_template),
             HumanMessagePromptTemplate.from_template(general_user_template)
         ]
-        aqa_prompt = ChatPromptTemplate.from_messages(messages)
-
-        self.conversation = ConversationalRetrievalChain.from_llm(
-            self.llm, retriever=self.retriever, memory=self.memory, combine_docs_chain_kwargs={"prompt": aqa_prompt}, verbose=True
-        )
-        logger.info("Conversation chain set up")
+        return ChatPromptTemplate.from_messages(messages)
+
+    @staticmethod
+    def format_context(docs):
+        sections = []
+        for doc in docs:
+            section = f"Source: {doc.metadata.get('source', '')}\n{doc.page_content}"
+            image_urls = decode_image_urls(doc.metadata.get("image_urls"))
+            if image_urls:
+                section += f"\nImages: {', '.join(image_urls)}"
+            sections.append(section)
+        return "\n\n".join(sections)
 
     async def initialize_data(self):
         logger.info("Initializing data")
-        self.data_fetching = True
         urls = self.get_urls()
         await self.scrape_data_from_urls(urls)
 
-    def get_response(self, question, num_results=20):
-        if self.data_fetching:
-            logger.warning("Data fetching in progress, unable to respond")
-            return "Currently fetching data. Please try again in a few moments."
-        elif not self.vector_store:
-            logger.warning("Vector store not available, unable to respond")
-            return "Data is not yet available. Please wait a moment and try again."
-        
-        self.first_fetch = False
-        
-        if not self.vector_store:
-            logger.warning("Vector store not available, unable to respond")
-            return "Data is not yet available. Please try again in a few moments."
-        
-        try:
-            logger.info(f"Generating response for question: {question}")
-            search_results = []
-            
-            # Iterate over each URL in urls.txt and generate search URLs
-            urls = self.get_urls()
-            for url in urls:
-                search_url = f"{url}/search?q={question.replace(' ', '+')}"
-                search_results.append(f"Check out products at: {search_url}")
-
-            # Return formatted response with URLs
-            formatted_response = "\n".join(search_results)
-            logger.info(f"Response generated for question: {question}")
-            return formatted_response
-        except Exception as e:
-            logger.exception(f"An error occurred while generating the response: {e}")
-            return "An error occurred while processing your request. Please try again later."
+    def clear_session(self, session_id):
+        self.sessions.clear(session_id)
+
+    def stream_response(self, question, session_id=None, images=None):
+        # Yields the answer in pieces: catalog matches, then LLM tokens as they arrive, then search links.
+        # A list passed as images is filled with product image URLs for the answer.
+        # Always answers from the last complete index, even while a refresh is running
+        start = time.perf_counter()
+        with self.index.read() as index:
+            if index is None:
+                logger.warning("Vector store not available, unable to respond")
+                yield "Data is not yet available. Please wait a moment and try again."
+                return
+
+            memory = self.sessions.get(session_id) if session_id else WindowedMemory()
+            history = memory.as_text()
+
+            try:
+                # Cached answers ignore earlier turns, so only a fresh conversation may use them
+                version = (index.generation, self.catalog_version)
+                # The question is embedded at most once, and not at all when BM25 alone answers it
+                query_embeddings = QueryEmbeddings(self.embeddings)
+                embed_query = query_embeddings.embed_query if index.retriever.needs_embedding(question) else None
+                lookup = None if history else self.response_cache.lookup(question, version, embed_query)
+                if lookup is not None and lookup.answer is not None:
+                    logger.info(f"Serving {lookup.tier} cached response for question: {question}")
+                    memory.add(question, lookup.answer)
+                    if images is not None:
+                        images.extend(lookup.images)
+                    yield lookup.answer
+                    metrics.inc("responses", source=lookup.tier)
+                    metrics.observe("get_response", time.perf_counter() - start)
+                    return
+
+                logger.info(f"Generating response for question: {question}")
+                parts = []
+
+                # Structured matches first, when the question names a brand, color or price range
+                try:
+                    products = self.catalog.search(question, query_embeddings.embed_query)
+                except Exception as e:
+                    # The catalog section is optional; the retrieved pages can still answer
+                    logger.warning(f"Leaving out catalog matches for question {question}: {e}")
+                    products = []
+                if products:
+                    lines = ["Products matching your question:"]
+                    for product in products:
+                        # Products without a parsed price (NaN) still match brand and color questions
+                        price = f" (PKR {product.price:,.0f})" if product.price == product.price else ""
+                        lines.append(f"- {product.brand.title()}: {product.title}{price} {product.url}")
+                    parts.append("\n".join(lines) + "\n\n")
+                    yield parts[-1]
+
+                with metrics.span("retrieve"):
+                    docs = index.retriever.invoke(question, embed_query=embed_query)
+                answer_images = self.answer_images(products, docs)
+                if images is not None:
+                    images.extend(answer_images)
+                messages = self.answer_prompt.format_messages(
+                    chat_history=history, context=self.format_context(docs), question=question
+                )
+                answer = []
+                llm_start = time.perf_counter()
+                for chunk in self.llm.stream(messages):
+                    if chunk.content:
+                        answer.append(chunk.content)
+                        yield chunk.content
+                metrics.observe("llm", time.perf_counter() - llm_start)
+                parts.append("".join(answer))
+
+                # Precomputed per-brand search URL templates from the registry
+                links = [f"Check out products at: {search_url}" for search_url in self.url_registry.search_urls(question)]
+                parts.append("\n\n" + "\n".join(links))
+                yield parts[-1]
+
+                memory.add(question, "".join(answer))
+                if lookup is not None:
+                    self.response_cache.store(lookup, "".join(parts), answer_images)
+                metrics.inc("responses", source="llm")
+                metrics.observe("get_response", time.perf_counter() - start)
+                logger.info(f"Response generated for question: {question}")
+            except Exception as e:
+                metrics.inc("response_errors")
+                logger.exception(f"An error occurred while generating the response: {e}")
+                yield "An error occurred while processing your request. Please try again later."
+
+    def question_facets(self, question):
+        # "lawn suits khaadi" and "lawn suits sapphire" must not share a cached answer. Brands and
+        # colors do not depend on the catalog alone, which is empty on a cold start and misses some sites
+        filters = self.catalog.parse_filters(question)
+        brands = set(filters["brands"]) | set(match_brands(question, [site.name for site in self.url_registry.sites]))
+        colors = set(filters["colors"]) | set(match_colors(question))
+        return tuple(sorted(brands)), tuple(sorted(colors))
+
+    @staticmethod
+    def answer_images(products, docs, limit=6):
+        # Catalog matches first, then images from the retrieved pages
+        sources = [image for product in products for image in resolve_image_urls(product.url, [product.image])
+                   if product.image]
+        for doc in docs:
+            sources.extend(decode_image_urls(doc.metadata.get("image_urls")))
+        return resolve_image_urls("", sources, limit=limit)
+
+    def get_response(self, question, session_id=None):
+        return "".join(self.stream_response(question, session_id))
 
     def start_periodic_scraping(self):
         def run_scraping():
             while True:
                 logger.info("Starting periodic scraping")
-                asyncio.run(self.initialize_data())
+                try:
+                    asyncio.run(self.initialize_data())
+                except Exception as e:
+                    # The live index stays as it was; the next cycle retries
+                    logger.exception(f"Periodic scraping failed: {e}")
+                    metrics.inc("scrape_failures")
                 logger.info(f"Sleeping for {self.fetch_interval} seconds before next scrape")
                 time.sleep(self.fetch_interval)
 
@@ -206,10 +536,3 @@ class FashionBot:
         thread.start()
         logger.info("Periodic scraping thread started")
 
-# Initialize the bot and start periodic scraping
-fashion_bot = FashionBot()
-fashion_bot.start_periodic_scraping()
-
-# Expose the fashion_bot instance
-def get_fashion_bot():
-    return fashion_bot
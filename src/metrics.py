@@ -0,0 +1,204 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "fashion_bot"
+# Seconds; stages range from sub-millisecond retrievals to minute-long index builds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.recent = deque(maxlen=1024)  # for percentiles on the admin page
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += value
+        self.recent.append(value)
+
+    def percentile(self, pct):
+        ordered = sorted(self.recent)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        if exc_type is not None:
+            self.metrics.inc("stage_errors", stage=self.stage)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """Stage timings, counters and gauges for the bot pipeline, rendered in Prometheus text format.
+
+    When disabled every call returns immediately, so instrumentation can stay in hot paths.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.histograms = {}  # stage -> _Histogram
+        self.counters = {}  # (name, labels) -> value
+        self.gauges = {}  # name -> value or zero-argument callable
+
+    @classmethod
+    def from_env(cls):
+        return cls().configure()
+
+    def configure(self):
+        # The shared registry is created on import, before bootstrap() loads .env, so it is
+        # configured again from there
+        self.enabled = os.getenv("METRICS_ENABLED", "1") == "1"
+        return self
+
+    def span(self, stage):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = _Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value):
+        # value may be a callable evaluated at scrape time, e.g. the age of the last crawl
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[name] = value
+
+    def _gauge_values(self):
+        values = {}
+        for name, value in list(self.gauges.items()):
+            try:
+                values[name] = value() if callable(value) else value
+            except Exception as e:
+                logger.warning(f"Gauge {name} failed: {e}")
+        return values
+
+    def render(self):
+        lines = []
+        with self.lock:
+            histograms = {stage: (list(h.counts), h.count, h.total) for stage, h in self.histograms.items()}
+            counters = dict(self.counters)
+        if histograms:
+            lines.append(f"# TYPE {PREFIX}_stage_seconds histogram")
+        for stage, (counts, count, total) in sorted(histograms.items()):
+            cumulative = 0
+            for bound, bucket in zip(BUCKETS, counts):
+                cumulative += bucket
+                lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{PREFIX}_stage_seconds_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{PREFIX}_stage_seconds_count{{stage="{stage}"}} {count}')
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            for (counter, labels), value in sorted(counters.items()):
+                if counter == name:
+                    lines.append(f"{PREFIX}_{name}_total{_label_text(labels)} {value}")
+        for name, value in sorted(self._gauge_values().items()):
+            if value is None:
+                continue
+            lines.append(f"# TYPE {PREFIX}_{name} gauge")
+            lines.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        # Plain rows for the admin page
+        with self.lock:
+            stages = [
+                {"stage": stage, "count": h.count, "total_s": round(h.total, 3),
+                 "mean_ms": round(h.total / h.count * 1000, 2) if h.count else None,
+                 "p50_ms": round(h.percentile(50) * 1000, 2) if h.recent else None,
+                 "p99_ms": round(h.percentile(99) * 1000, 2) if h.recent else None}
+                for stage, h in sorted(self.histograms.items())
+            ]
+            counters = [{"counter": name + _label_text(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+        gauges = [{"gauge": name, "value": value} for name, value in sorted(self._gauge_values().items())]
+        return {"stages": stages, "counters": counters, "gauges": gauges}
+
+
+metrics = Metrics.from_env()
+
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    # Serves GET /metrics for Prometheus; bound to localhost unless METRICS_HOST says otherwise
+    port = port or int(os.getenv("METRICS_PORT", 9108))
+    host = os.getenv("METRICS_HOST", host)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
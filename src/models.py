@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, String
+from sqlalchemy.orm import declarative_base
+
+Base = declarative_base()
+
+class User(Base):
+    __tablename__ = 'users'
+    
+    id = Column(Integer, primary_key=True)
+    email = Column(String(120), unique=True, index=True, nullable=False)
+    username = Column(String(150), unique=True, index=True, nullable=False)
+    password = Column(String(60), nullable=False)
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from indexer import storable
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class PipelineError(Exception):
+    pass
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.busy = 0.0     # seconds spent working
+        self.blocked = 0.0  # seconds spent waiting for the next stage to take the output
+        self.max_queue = 0  # deepest the stage's input queue got
+
+    def as_dict(self):
+        return {"items": self.items, "busy_s": round(self.busy, 3), "blocked_s": round(self.blocked, 3),
+                "max_queue": self.max_queue}
+
+
+class RefreshPipeline:
+    """Streams scraped sites through strip+split, embed and index-write stages in their own threads.
+
+    Stages are connected by queues of at most queue_size items. A slow stage therefore holds back the
+    ones before it, down to the crawler, instead of letting pages pile up in memory. Because the
+    stages overlap, a refresh takes about as long as its slowest stage rather than the sum of all.
+    The index is written in batches of write_batch_size chunks into the target returned by
+    open_target(), which is only called once there is something to write.
+    """
+
+    def __init__(self, planner, stripper, embeddings, open_target, queue_size=4, embed_batch_size=64,
+                 write_batch_size=256):
+        self.planner = planner
+        self.stripper = stripper
+        self.embeddings = embeddings
+        self.open_target = open_target
+        self.queue_size = queue_size
+        self.embed_batch_size = embed_batch_size
+        self.write_batch_size = write_batch_size
+        self.target = None  # (generation, vector_store, bm25) once opened
+        self.keep_urls = set()
+        self.error = None
+        self.boilerplate_stats = {}
+        self.pages = 0
+        self.written_chunks = 0
+        self.deleted_chunks = 0
+        self.started = None
+        self.seconds = None
+        self.stats = {name: StageStats(name) for name in ("prepare", "embed", "write")}
+        self.sites = queue.Queue()  # bounded by self.slots, so the event loop never blocks on it
+        self.batches = queue.Queue(maxsize=queue_size)
+        self.writes = queue.Queue(maxsize=queue_size)
+        self.slots = None
+        self.loop = None
+        self.pending_chunks = []
+        self.pending_removed = []
+        self.write_buffer = []
+        self.threads = [
+            threading.Thread(target=self._run, args=("prepare", self.sites, self._prepare, self.batches,
+                                                     self._finish_prepare), name="refresh-prepare", daemon=True),
+            threading.Thread(target=self._run, args=("embed", self.batches, self._embed, self.writes, None),
+                             name="refresh-embed", daemon=True),
+            threading.Thread(target=self._run, args=("write", self.writes, self._write, None, self._flush_writes),
+                             name="refresh-write", daemon=True),
+        ]
+
+    def start(self):
+        self.started = time.perf_counter()
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    async def put(self, documents):
+        # One site's pages; waits while queue_size sites are already queued, which pauses the crawler
+        if self.error is not None:
+            raise PipelineError(f"Refresh pipeline failed: {self.error}")
+        if self.slots is None:
+            self.loop = asyncio.get_running_loop()
+            self.slots = asyncio.Semaphore(self.queue_size)
+        await self.slots.acquire()
+        self.sites.put(documents)
+
+    def close(self, keep_urls=()):
+        # Blocks until every stage has drained; raises if any of them failed
+        self.keep_urls = set(keep_urls)
+        self.sites.put(_DONE)
+        for thread in self.threads:
+            thread.join()
+        self.seconds = time.perf_counter() - self.started
+        if self.error is not None:
+            raise PipelineError(f"Refresh pipeline failed: {self.error}") from self.error
+        return self.planner.diff
+
+    def abort(self):
+        # Stops the stages without finishing the plan; whatever was written should be discarded
+        self.error = self.error or PipelineError("aborted")
+        self.sites.put(_DONE)
+        for thread in self.threads:
+            thread.join()
+
+    def _run(self, name, inbox, handle, outbox, finish):
+        stats = self.stats[name]
+        while True:
+            stats.max_queue = max(stats.max_queue, inbox.qsize())
+            item = inbox.get()
+            if item is _DONE:
+                break
+            if inbox is self.sites:
+                self._release_slot()
+            # After a failure the remaining items are drained unprocessed so no producer stays blocked
+            if self.error is None:
+                stats.items += 1
+                self._drive(stats, lambda: handle(item), outbox)
+        if finish is not None and self.error is None:
+            self._drive(stats, finish, outbox)
+        if outbox is not None:
+            outbox.put(_DONE)
+
+    def _release_slot(self):
+        try:
+            self.loop.call_soon_threadsafe(self.slots.release)
+        except RuntimeError:
+            pass  # the crawl's event loop is already gone
+
+    def _drive(self, stats, produce, outbox):
+        # Runs one step of a stage and hands its results on; waiting on a full queue is not work
+        start = time.perf_counter()
+        try:
+            for result in produce():
+                stats.busy += time.perf_counter() - start
+                start = time.perf_counter()
+                outbox.put(result)
+                stats.blocked += time.perf_counter() - start
+                start = time.perf_counter()
+            stats.busy += time.perf_counter() - start
+        except Exception as e:
+            logger.exception(f"Refresh pipeline stage {stats.name} failed: {e}")
+            self.error = self.error or e
+
+    def _prepare(self, documents):
+        with metrics.span("boilerplate"):
+            documents, stats = self.stripper.strip(documents)
+        for key, value in stats.items():
+            self.boilerplate_stats[key] = self.boilerplate_stats.get(key, 0) + value
+        for doc in documents:
+            self.pages += 1
+            with metrics.span("split"):
+                added, removed = self.planner.add(doc)
+            self.pending_chunks.extend(added)
+            self.pending_removed.extend(removed)
+            while len(self.pending_chunks) >= self.embed_batch_size:
+                yield self._take_batch(self.embed_batch_size)
+
+    def _finish_prepare(self):
+        with metrics.span("split"):
+            added, removed = self.planner.finish(self.keep_urls)
+        self.pending_chunks.extend(added)
+        self.pending_removed.extend(removed)
+        while self.pending_chunks or self.pending_removed:
+            yield self._take_batch(self.embed_batch_size)
+
+    def _take_batch(self, size):
+        chunks, self.pending_chunks = self.pending_chunks[:size], self.pending_chunks[size:]
+        removed, self.pending_removed = self.pending_removed, []
+        return removed, chunks
+
+    def _embed(self, batch):
+        removed, chunks = batch
+        vectors = self.embeddings.embed_documents([chunk.page_content for _, chunk in chunks]) if chunks else []
+        yield removed, chunks, vectors
+
+    def _write(self, batch):
+        self.write_buffer.append(batch)
+        if sum(len(chunks) for _, chunks, _ in self.write_buffer) >= self.write_batch_size:
+            self._flush()
+        return ()
+
+    def _flush_writes(self):
+        self._flush()
+        return ()
+
+    def _flush(self):
+        batches, self.write_buffer = self.write_buffer, []
+        removed = [cid for ids, _, _ in batches for cid in ids]
+        chunks = [item for _, items, _ in batches for item in items]
+        vectors = [vector for _, _, batch_vectors in batches for vector in batch_vectors]
+        if not removed and not chunks:
+            return
+        if self.target is None:
+            self.target = self.open_target()
+        _, vector_store, bm25 = self.target
+        with metrics.span("index_write"):
+            # Deletions first: they were planned before the additions that follow them
+            if removed:
+                vector_store.delete(ids=removed)
+                for cid in removed:
+                    bm25.remove(cid)
+            if chunks:
+                documents = [storable(chunk) for _, chunk in chunks]
+                vector_store._collection.upsert(
+                    ids=[cid for cid, _ in chunks],
+                    embeddings=vectors,
+                    documents=[doc.page_content for doc in documents],
+                    metadatas=[doc.metadata for doc in documents],
+                )
+                for cid, chunk in chunks:
+                    bm25.add(cid, chunk.page_content, chunk.metadata)
+        self.written_chunks += len(chunks)
+        self.deleted_chunks += len(removed)
+
+    def summary(self):
+        stages = ", ".join(f"{stats.name} {stats.busy:.2f}s busy/{stats.blocked:.2f}s blocked"
+                           for stats in self.stats.values())
+        return (f"{self.pages} pages, {self.written_chunks} chunks written, {self.deleted_chunks} deleted "
+                f"in {self.seconds:.2f}s ({stages})")
+
+    def as_dict(self):
+        return {"pages": self.pages, "written_chunks": self.written_chunks, "deleted_chunks": self.deleted_chunks,
+                "seconds": round(self.seconds, 3) if self.seconds is not None else None,
+                "stages": {name: stats.as_dict() for name, stats in self.stats.items()}}
@@ -0,0 +1,179 @@
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_NUMBER = re.compile(r"\d+")
+
+
+def normalize_query(text):
+    return " ".join(_PUNCTUATION.sub(" ", text.lower()).split())
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    answer: str
+    vector: object  # unit-length numpy vector, or None when the semantic tier is off
+    numbers: tuple
+    created_at: float
+    size: int
+    images: tuple = ()
+    facets: object = None
+
+
+@dataclass
+class CacheLookup:
+    key: str
+    version: object
+    answer: str = None
+    tier: str = None  # "exact", "semantic" or None on a miss
+    vector: object = None
+    images: tuple = ()
+    facets: object = None
+
+
+class ResponseCache:
+    """Answer cache with an exact tier on normalized text and a semantic tier on query embeddings.
+
+    Entries belong to one version of the data they were built from; looking up with a new version
+    drops everything, so a refresh never serves answers built from the previous index or catalog.
+    A semantic hit also needs the same numbers and the same facets(question), e.g. brands and
+    colors, since questions differing only in those embed almost alike. The caller passes
+    embed_query to lookup(), so the question's vector can be shared with retrieval; without it
+    only the exact tier is checked.
+    """
+
+    def __init__(self, semantic=True, facets=None, similarity=0.95, ttl=3600, max_entries=1000,
+                 max_bytes=64 * 1024 * 1024):
+        self.semantic = semantic
+        self.facets = facets
+        self.similarity = similarity
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # key -> CacheEntry, least recently used first
+        self.version = None
+        self.total_bytes = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls, facets=None):
+        return cls(
+            semantic=os.getenv("RESPONSE_CACHE_SEMANTIC", "1") != "0",
+            facets=facets,
+            similarity=float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0.95)),
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL", 3600)),
+            max_entries=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+            max_bytes=int(float(os.getenv("RESPONSE_CACHE_MAX_MB", 64)) * 1024 * 1024),
+        )
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self.entries:
+                self.invalidations += 1
+                logger.info(f"Data version changed to {version}, dropping {len(self.entries)} cached answers")
+            self.entries.clear()
+            self.total_bytes = 0
+            self.version = version
+
+    def _expired(self, entry, now):
+        return self.ttl and now - entry.created_at > self.ttl
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry.size
+
+    def lookup(self, question, version, embed_query=None):
+        key = normalize_query(question)
+        numbers = tuple(_NUMBER.findall(key))
+        facets = self.facets(question) if self.facets else None
+        now = time.time()
+        with self.lock:
+            self._check_version(version)
+            entry = self.entries.get(key)
+            if entry is not None:
+                if self._expired(entry, now):
+                    self._remove(key)
+                else:
+                    self.entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return CacheLookup(key, version, entry.answer, "exact", images=entry.images)
+            # Prices and sizes must match exactly ("under 5000" and "under 3000" embed almost alike),
+            # and so must the facets
+            candidates = [(k, e.vector) for k, e in self.entries.items()
+                          if e.vector is not None and e.numbers == numbers and e.facets == facets]
+
+        if not self.semantic or embed_query is None:
+            with self.lock:
+                self.misses += 1
+            return CacheLookup(key, version, facets=facets)
+
+        # Embed outside the lock; this is the only slow step of a lookup
+        vector = np.asarray(embed_query(question), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        vector = vector / norm if norm else vector
+
+        best_key = None
+        if candidates:
+            matrix = np.stack([candidate for _, candidate in candidates])
+            scores = matrix @ vector
+            best = int(np.argmax(scores))
+            if scores[best] >= self.similarity:
+                best_key = candidates[best][0]
+
+        with self.lock:
+            entry = self.entries.get(best_key) if best_key is not None else None
+            if entry is not None and entry.numbers == numbers and entry.facets == facets \
+                    and not self._expired(entry, now) and version == self.version:
+                self.entries.move_to_end(best_key)
+                self.semantic_hits += 1
+                return CacheLookup(key, version, entry.answer, "semantic", vector, entry.images, facets)
+            self.misses += 1
+        return CacheLookup(key, version, vector=vector, facets=facets)
+
+    def store(self, lookup, answer, images=()):
+        vector = lookup.vector
+        images = tuple(images)
+        size = len(lookup.key) + len(answer) * 2 + sum(len(url) for url in images) * 2 \
+            + (vector.nbytes if vector is not None else 0) + 200
+        entry = CacheEntry(lookup.key, answer, vector, tuple(_NUMBER.findall(lookup.key)), time.time(), size, images,
+                           lookup.facets)
+        with self.lock:
+            if lookup.version != self.version:
+                return
+            if lookup.key in self.entries:
+                self._remove(lookup.key)
+            self.entries[lookup.key] = entry
+            self.total_bytes += size
+            while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.total_bytes,
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "version": self.version,
+            }
@@ -0,0 +1,141 @@
+import logging
+import os
+import threading
+from logging.handlers import RotatingFileHandler
+
+# Process-wide services, created lazily on first use. Streamlit re-executes app.py on every
+# interaction, but imported modules persist, so these singletons survive reruns.
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.RLock()
+_bootstrapped = False
+_fashion_bot = None
+_auth_service = None
+_url_finder_thread = None
+_metrics_server = None
+_image_proxy = None
+
+
+def configure_logging():
+    # Appends across restarts with size-based rotation; LOG_LEVEL=DEBUG for troubleshooting
+    file_handler = RotatingFileHandler('fashion_bot.log', maxBytes=10 * 1024 * 1024, backupCount=3)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(),
+                        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                        handlers=[file_handler])
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    console_handler.setFormatter(formatter)
+    logging.getLogger('').addHandler(console_handler)
+
+
+def bootstrap():
+    # Environment and logging are set up exactly once per process
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    with _lock:
+        if _bootstrapped:
+            return
+        from dotenv import load_dotenv
+
+        from metrics import metrics
+
+        load_dotenv()
+        os.environ["TOKENIZERS_PARALLELISM"] = "false"
+        configure_logging()
+        metrics.configure()
+        _bootstrapped = True
+
+
+def background_jobs_enabled():
+    # Benchmarks and tests set DISABLE_BACKGROUND_JOBS=1 to skip scraping and URL discovery
+    return os.getenv("DISABLE_BACKGROUND_JOBS", "0") != "1"
+
+
+def get_fashion_bot():
+    global _fashion_bot
+    if _fashion_bot is not None:
+        return _fashion_bot
+    with _lock:
+        if _fashion_bot is None:
+            bootstrap()
+            from main import FashionBot
+
+            fashion_bot = FashionBot()
+            if background_jobs_enabled():
+                fashion_bot.start_periodic_scraping()
+            _fashion_bot = fashion_bot
+            logger.info("FashionBot instance created")
+    return _fashion_bot
+
+
+def get_image_proxy():
+    global _image_proxy
+    if _image_proxy is not None:
+        return _image_proxy
+    with _lock:
+        if _image_proxy is None:
+            bootstrap()
+            from images import ImageProxy
+
+            _image_proxy = ImageProxy.from_env()
+    return _image_proxy
+
+
+def get_auth_service():
+    global _auth_service
+    if _auth_service is not None:
+        return _auth_service
+    with _lock:
+        if _auth_service is None:
+            bootstrap()
+            from auth import AuthService
+
+            _auth_service = AuthService()
+    return _auth_service
+
+
+def start_url_finder(queries=None):
+    # Runs URL discovery once per process instead of once per Streamlit rerun
+    global _url_finder_thread
+    if not background_jobs_enabled():
+        return
+    with _lock:
+        if _url_finder_thread is not None:
+            return
+
+        def run():
+            from urls_finder import URLFinder, search_queries
+
+            url_finder = URLFinder()
+            try:
+                url_finder.discover(queries or search_queries())
+            except Exception as e:
+                logger.error(f"URL discovery failed: {e}")
+            finally:
+                url_finder.close()
+            logger.info("URL Finder finished")
+
+        _url_finder_thread = threading.Thread(target=run, daemon=True)
+        _url_finder_thread.start()
+        logger.info("URL Finder thread initialized")
+
+
+def start_metrics_server():
+    # One Prometheus endpoint per process; a second app process on the same port just logs and goes on
+    global _metrics_server
+    from metrics import metrics, start_metrics_server as serve_metrics
+
+    if not metrics.enabled:
+        return
+    with _lock:
+        if _metrics_server is not None:
+            return
+        try:
+            _metrics_server = serve_metrics()
+        except OSError as e:
+            _metrics_server = False
+            logger.warning(f"Metrics endpoint not started: {e}")
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English/Roman-Urdu text; no tokenizer dependency
+    return len(text) // 4 + 1
+
+
+class WindowedMemory:
+    """Keeps the most recent turns of one conversation within a turn window and token budget."""
+
+    def __init__(self, max_turns=5, max_tokens=1000):
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.turns = []  # (question, answer) pairs, oldest first
+        self.last_used = time.monotonic()
+
+    def add(self, question, answer):
+        # A single oversized answer is cut rather than allowed to blow the budget on its own
+        answer = answer[:self.max_tokens * 4]
+        self.turns.append((question, answer))
+        del self.turns[:-self.max_turns]
+        # Drop the oldest turns until the history fits the prompt budget
+        while len(self.turns) > 1 and self.token_count() > self.max_tokens:
+            self.turns.pop(0)
+        self.last_used = time.monotonic()
+
+    def token_count(self):
+        return sum(estimate_tokens(question) + estimate_tokens(answer) for question, answer in self.turns)
+
+    def as_text(self):
+        self.last_used = time.monotonic()
+        return "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in self.turns)
+
+    def clear(self):
+        self.turns = []
+
+
+class SessionMemoryStore:
+    """One WindowedMemory per session key, with idle sessions and the overflow evicted LRU-first."""
+
+    def __init__(self, max_turns=None, max_tokens=None, max_sessions=1000, idle_ttl=6 * 3600):
+        self.max_turns = max_turns or int(os.getenv("MEMORY_MAX_TURNS", 5))
+        self.max_tokens = max_tokens or int(os.getenv("MEMORY_MAX_TOKENS", 1000))
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self.lock:
+            memory = self.sessions.get(session_id)
+            if memory is None:
+                memory = WindowedMemory(self.max_turns, self.max_tokens)
+                self.sessions[session_id] = memory
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+            for key in [key for key, value in self.sessions.items() if now - value.last_used > self.idle_ttl]:
+                if key != session_id:
+                    del self.sessions[key]
+        return memory
+
+    def clear(self, session_id):
+        with self.lock:
+            self.sessions.pop(session_id, None)
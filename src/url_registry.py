@@ -0,0 +1,135 @@
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from urllib.parse import quote_plus, urlparse
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BrandSite:
+    name: str
+    base_url: str
+    domain: str
+    search_template: str  # format with query=<url-encoded question>
+
+    def search_url(self, question):
+        return self.search_template.format(query=quote_plus(question))
+
+
+def brand_from_url(url):
+    host = urlparse(url).netloc.lower()
+    labels = [label for label in host.split(".") if label not in ("www", "pk", "shop", "store")]
+    return labels[0] if labels else host
+
+
+def normalize_url(url):
+    # Returns (base url, domain) or None for lines that are not usable site URLs
+    url = url.strip()
+    if not url or url.startswith("#"):
+        return None
+    if "://" not in url:
+        url = f"https://{url}"
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.netloc or any(c.isspace() for c in parsed.netloc):
+        return None
+    netloc = parsed.netloc.lower()
+    domain = netloc[4:] if netloc.startswith("www.") else netloc
+    base_url = f"{parsed.scheme.lower()}://{netloc}{parsed.path.rstrip('/')}"
+    return base_url, domain
+
+
+def load_sites(path):
+    sites = []
+    seen = set()
+    try:
+        with open(path, 'r') as file:
+            lines = file.read().splitlines()
+    except FileNotFoundError:
+        logger.warning(f"URL file {path} not found")
+        return ()
+    for line in lines:
+        normalized = normalize_url(line)
+        if normalized is None:
+            continue
+        base_url, domain = normalized
+        if domain in seen:
+            continue
+        seen.add(domain)
+        sites.append(BrandSite(brand_from_url(base_url), base_url, domain, f"{base_url}/search?q={{query}}"))
+    return tuple(sites)
+
+
+_CHANGE_EVENTS = ("created", "modified", "moved", "deleted", "closed")
+
+
+class _ReloadHandler(FileSystemEventHandler):
+    def __init__(self, registry):
+        self.registry = registry
+
+    def on_any_event(self, event):
+        # Reading the files in reload() emits "opened" and "closed_no_write" events of its own
+        if event.event_type not in _CHANGE_EVENTS:
+            return
+        paths = {os.path.abspath(getattr(event, "src_path", "")), os.path.abspath(getattr(event, "dest_path", "") or "")}
+        if paths & self.registry.watched_paths:
+            self.registry.reload()
+
+
+class URLRegistry:
+    """urls.txt and scraped_urls.txt loaded once, normalized and deduplicated, and hot-reloaded.
+
+    Readers get immutable tuples that are replaced wholesale on reload, so lookups never touch disk.
+    Discovered sites are unreviewed search results, so they are only scraped with
+    include_discovered (SCRAPE_DISCOVERED=1); search links always come from urls.txt alone.
+    """
+
+    def __init__(self, urls_path='urls.txt', discovered_path=None, include_discovered=None, watch=True):
+        self.urls_path = urls_path
+        self.discovered_path = discovered_path or os.getenv("DISCOVERY_OUTPUT", "scraped_urls.txt")
+        if include_discovered is None:
+            include_discovered = os.getenv("SCRAPE_DISCOVERED", "0") == "1"
+        self.include_discovered = include_discovered
+        self.watched_paths = {os.path.abspath(urls_path), os.path.abspath(self.discovered_path)}
+        self.sites = ()
+        self.discovered = ()  # sites in the discovery file that urls.txt does not already list
+        self.lock = threading.Lock()
+        self.observer = None
+        self.reload()
+        if watch:
+            self.start_watching()
+
+    def reload(self):
+        with self.lock:
+            sites = load_sites(self.urls_path)
+            known = {site.domain for site in sites}
+            discovered = tuple(site for site in load_sites(self.discovered_path) if site.domain not in known)
+            changed = (sites, discovered) != (self.sites, self.discovered)
+            self.sites, self.discovered = sites, discovered
+        if changed:
+            logger.info(f"URL registry loaded {len(sites)} brand sites and {len(discovered)} discovered sites")
+
+    def start_watching(self):
+        directories = {os.path.dirname(path) for path in self.watched_paths}
+        self.observer = Observer()
+        handler = _ReloadHandler(self)
+        for directory in directories:
+            self.observer.schedule(handler, directory, recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer = None
+
+    def urls(self):
+        sites = self.sites + self.discovered if self.include_discovered else self.sites
+        return [site.base_url for site in sites]
+
+    def search_urls(self, question):
+        return [site.search_url(question) for site in self.sites]
@@ -1,60 +1,316 @@
 import logging
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from urllib.parse import urlparse
-import time
+import os
+import queue
 import re
+import socket
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, quote_plus, urljoin, urlparse
+
+import requests
 from dotenv import load_dotenv
-import os
+from lxml import etree, html as lxml_html
+
+from url_registry import load_sites, normalize_url
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINES = "https://www.google.com/search?q=,https://www.bing.com/search?q=,https://duckduckgo.com/html/?q="
+# Search engines, portals and social networks that show up in results but are not brand stores
+EXCLUDED_DOMAINS = (
+    "google.", "bing.com", "yahoo.com", "duckduckgo.com", "microsoft.com", "facebook.com", "instagram.com",
+    "youtube.com", "twitter.com", "x.com", "pinterest.com", "wikipedia.org", "linkedin.com", "tiktok.com",
+)
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0 Safari/537.36")
+
+
+def unwrap_result_link(href):
+    # Search engines wrap result links in redirects: /url?q=, duckduckgo's uddg=, yahoo's /RU=
+    parsed = urlparse(href)
+    params = parse_qs(parsed.query)
+    for key in ("q", "url", "uddg", "u"):
+        if key in params and re.match(r'^https?://', params[key][0]):
+            return params[key][0]
+    match = re.search(r'/RU=(https?[^/]+)/', href)
+    if match:
+        return requests.utils.unquote(match.group(1))
+    return href
+
+
+def extract_result_urls(page_html, page_url, excluded=EXCLUDED_DOMAINS):
+    # Returns result links in page order, deduplicated by domain
+    try:
+        tree = lxml_html.fromstring(page_html)
+    except (ValueError, etree.ParserError):
+        return []
+    engine_domain = (normalize_url(page_url) or ("", ""))[1]
+    urls = []
+    seen = set()
+    for href in tree.xpath("//a/@href"):
+        href = unwrap_result_link(urljoin(page_url, href))
+        if not re.match(r'^https?://', href):
+            continue
+        normalized = normalize_url(href)
+        if normalized is None:
+            continue
+        domain = normalized[1]
+        if domain == engine_domain or domain in seen or any(part in domain for part in excluded):
+            continue
+        seen.add(domain)
+        urls.append(href)
+    return urls
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class DriverPool:
+    """A bounded pool of long-lived Chrome drivers, created on first use and reused across searches.
+
+    Every driver gets its own DevTools port, so several pools or processes can run side by side.
+    """
+
+    def __init__(self, size=2, headless=True, driver_path=None):
+        self.size = size
+        self.headless = headless
+        self.driver_path = driver_path or os.getenv("CHROMEDRIVER_PATH")
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+        self.drivers = []
+
+    def _create(self):
+        from selenium import webdriver
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        options = Options()
+        if self.headless:
+            options.add_argument("--headless")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--window-size=1920,1080")
+        options.add_argument("--disable-setuid-sandbox")
+        options.add_argument(f"--remote-debugging-port={_free_port()}")
+        service = Service(self.driver_path) if self.driver_path else Service()
+        driver = webdriver.Chrome(service=service, options=options)
+        driver.set_page_load_timeout(30)
+        return driver
+
+    def acquire(self, timeout=60):
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if create:
+            try:
+                driver = self._create()
+            except Exception:
+                with self.lock:
+                    self.created -= 1
+                raise
+            with self.lock:
+                self.drivers.append(driver)
+            return driver
+        return self.idle.get(timeout=timeout)
+
+    def release(self, driver, broken=False):
+        if broken:
+            # A crashed or hung driver is replaced on the next acquire instead of being reused
+            with self.lock:
+                self.created -= 1
+                self.drivers.remove(driver)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+            return
+        self.idle.put(driver)
+
+    def close(self):
+        with self.lock:
+            drivers, self.drivers = self.drivers, []
+            self.created = 0
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logger.warning(f"Error closing browser: {e}")
+
+
+class HTTPBackend:
+    """Fetches result pages with plain requests; enough for engines that render results server-side."""
+
+    name = "http"
+
+    def __init__(self, timeout=15):
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def fetch(self, url):
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+        response = session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def close(self):
+        pass
+
+
+class BrowserBackend:
+    """Fetches result pages through the driver pool, waiting for links to render instead of sleeping."""
+
+    name = "browser"
+
+    def __init__(self, pool, timeout=10):
+        self.pool = pool
+        self.timeout = timeout
+
+    def fetch(self, url):
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = self.pool.acquire()
+        broken = False
+        try:
+            driver.get(url)
+            wait = WebDriverWait(driver, self.timeout)
+            wait.until(lambda d: d.execute_script("return document.readyState") == "complete")
+            try:
+                wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "a[href^='http']")))
+            except TimeoutException:
+                logger.warning(f"No result links rendered within {self.timeout}s on {url}")
+            return driver.page_source
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.pool.release(driver, broken=broken)
+
+    def close(self):
+        self.pool.close()
+
+
+def merge_urls(path, urls):
+    # Appends domains not already in the file and replaces it atomically, so the registry watcher
+    # never sees a half-written file. Returns the URLs that were added.
+    known = {site.domain for site in load_sites(path)} if os.path.exists(path) else set()
+    added = []
+    for url in urls:
+        normalized = normalize_url(url)
+        if normalized is None or normalized[1] in known:
+            continue
+        known.add(normalized[1])
+        # The registry scrapes from the site root, not from the result page that was found
+        parsed = urlparse(normalized[0])
+        added.append(f"{parsed.scheme}://{parsed.netloc}")
+    if not added:
+        return []
+    existing = ""
+    if os.path.exists(path):
+        with open(path, 'r') as file:
+            existing = file.read()
+    if existing and not existing.endswith("\n"):
+        existing += "\n"
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as file:
+        file.write(existing + "\n".join(added) + "\n")
+    os.replace(tmp_path, path)
+    return added
+
 
 class URLFinder:
-    def __init__(self, headless=True):
-        # Configure logging
-        logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-        # Configure headless browser
-        self.options = Options()
-        if headless:
-            self.options.add_argument("--headless")
-        self.options.add_argument("--disable-gpu")
-        self.options.add_argument("--no-sandbox")
-        self.options.add_argument("--disable-dev-shm-usage")
-        self.options.add_argument("--window-size=1920,1080")
-        self.options.add_argument("--disable-setuid-sandbox")
-        self.options.add_argument("--remote-debugging-port=9222")  # Required for Chrome to start
+    """Discovers brand sites by running several search queries across search engines in parallel.
+
+    backend is "http" (plain requests), "browser" (pooled Chrome) or "auto", which tries plain HTTP
+    first and only falls back to the browser when a page yields no result links.
+    """
+
+    def __init__(self, headless=True, engines=None, backend=None, workers=None, output_path=None):
+        load_dotenv()
+        self.engines = engines or [engine.strip() for engine in
+                                   os.getenv("SEARCH_ENGINES", DEFAULT_ENGINES).split(",") if engine.strip()]
+        self.backend = backend or os.getenv("DISCOVERY_BACKEND", "auto")
+        self.workers = workers or int(os.getenv("DISCOVERY_WORKERS", 4))
+        self.output_path = output_path or os.getenv("DISCOVERY_OUTPUT", "scraped_urls.txt")
+        self.http = HTTPBackend()
+        self.browser = None
+        if self.backend != "http":
+            self.browser = BrowserBackend(DriverPool(int(os.getenv("DRIVER_POOL_SIZE", 2)), headless=headless))
 
         # Disable Selenium logging
         logging.getLogger('selenium').setLevel(logging.CRITICAL)
         logging.getLogger('urllib3').setLevel(logging.CRITICAL)
         logging.getLogger('http.client').setLevel(logging.CRITICAL)
-        logging.getLogger('asyncio').setLevel(logging.CRITICAL)
+
+    def search(self, engine, search_query, max_results=10):
+        url = f"{engine}{quote_plus(search_query)}"
+        backends = {"http": [self.http], "browser": [self.browser]}.get(self.backend, [self.http, self.browser])
+        for backend in backends:
+            try:
+                urls = extract_result_urls(backend.fetch(url), url)
+            except Exception as e:
+                logger.warning(f"{backend.name} search failed for {url}: {e}")
+                continue
+            if urls:
+                logger.info(f"{backend.name} found {len(urls)} result URLs on {url}")
+                return urls[:max_results]
+        return []
 
     def find_urls(self, search_query, max_results=10):
-        service = Service("/usr/local/bin/chromedriver")
-        driver = webdriver.Chrome(service=service, options=self.options)
+        return self.discover([search_query], max_results=max_results, merge=False)
+
+    def discover(self, queries, max_results=10, merge=True):
+        # Every (engine, query) pair is one task; results are deduplicated by domain in task order
+        tasks = [(engine, query) for query in queries for engine in self.engines]
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(tasks) or 1)) as pool:
+            results = list(pool.map(lambda task: self.search(*task, max_results=max_results), tasks))
         urls = []
-        try:
-            driver.get("https://www.google.com")
-            search_box = driver.find_element(By.NAME, "q")
-            search_box.send_keys(search_query)
-            search_box.submit()
-            time.sleep(3)
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, 'div#search')))
-            links = driver.find_elements(By.CSS_SELECTOR, 'div#search a')
-
-            for link in links[:max_results]:
-                href = link.get_attribute("href")
-                if href and re.match(r'^https?://', href):
-                    parsed_url = urlparse(href)
-                    if parsed_url.netloc.endswith(".com"):
-                        urls.append(href)
-
-        except Exception as e:
-            logging.error(f"An error occurred while finding URLs: {e}")
-        finally:
-            driver.quit()  # Ensure the driver is closed properly
\ No newline at end of file
+        seen = set()
+        for found in results:
+            for url in found:
+                domain = normalize_url(url)[1]
+                if domain not in seen:
+                    seen.add(domain)
+                    urls.append(url)
+        if merge:
+            added = merge_urls(self.output_path, urls)
+            logger.info(f"Discovered {len(urls)} sites, {len(added)} new, merged into {self.output_path}")
+        return urls
+
+    def close(self):
+        if self.browser is not None:
+            self.browser.close()
+
+
+def search_queries():
+    return [query.strip() for query in os.getenv("SEARCH_QUERY", "Pakistani women fashion brands").split("|")
+            if query.strip()]
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    interval = int(os.getenv("DATAFETCH_INTERVAL", 3600))
+    url_finder = URLFinder()
+    try:
+        while True:
+            url_finder.discover(search_queries())
+            time.sleep(interval)
+    finally:
+        url_finder.close()
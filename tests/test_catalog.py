@@ -0,0 +1,40 @@
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from catalog import match_brands, products_from_json_ld  # noqa: E402
+
+
+def page(*blocks):
+    return "".join(f'<script type="application/ld+json">{block}</script>' for block in blocks)
+
+
+def test_json_ld_odd_shapes_do_not_lose_the_page():
+    product = {"@type": ["Product"], "name": "Blue Lawn Suit", "color": ["Blue", "Navy"],
+               "brand": {"@type": "Brand", "name": "Khaadi"}, "offers": [{"price": "4,990"}],
+               "image": [{"url": "/images/blue.jpg"}]}
+    html = page('"just a string"', "42", "{not json", json.dumps([1, "x", product]),
+                json.dumps({"@graph": [{"@type": "Product", "name": "Red Kurta", "offers": "sold out",
+                                        "category": ["Kurta"], "url": "https://www.khaadi.com/p/red"}]}))
+
+    products = products_from_json_ld("https://www.khaadi.com/p/blue", html)
+
+    assert [(p.brand, p.title, p.color, p.category) for p in products] == [
+        ("khaadi", "Blue Lawn Suit", "blue", ""),
+        ("khaadi", "Red Kurta", "red", "kurta"),
+    ]
+    assert products[0].price == 4990.0
+    assert products[0].image == "https://www.khaadi.com/images/blue.jpg"
+    assert products[1].price != products[1].price  # no offer, NaN
+    assert products[1].url == "https://www.khaadi.com/p/red"
+
+
+def test_match_brands_by_name_prefix_and_joined_words():
+    brands = ["khaadi", "sapphireonline", "gulahmedshop", "junaidjamshed"]
+    assert match_brands("lawn suits khaadi", brands) == ["khaadi"]
+    assert match_brands("lawn suits sapphire", brands) == ["sapphireonline"]
+    assert match_brands("Lawn suits from Gul Ahmed?", brands) == ["gulahmedshop"]
+    assert match_brands("lawn suits under 5000", brands) == []
@@ -0,0 +1,44 @@
+import os
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from embedding import CachedEmbeddings  # noqa: E402
+
+
+class SlowEmbeddings:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak = 0
+
+    def embed_documents(self, texts):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.05)
+        with self.lock:
+            self.in_flight -= 1
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_in_flight_batches_are_bounded_across_callers():
+    model = SlowEmbeddings()
+    embeddings = CachedEmbeddings(model, "slow", batch_size=2, max_in_flight=2)
+    results = {}
+
+    def embed(name):
+        results[name] = embeddings.embed_documents([f"{name} {i}" for i in range(8)])
+
+    threads = [threading.Thread(target=embed, args=(name,)) for name in ("pipeline", "catalog")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.peak == 2
+    assert results["pipeline"] == [[float(len(f"pipeline {i}")), 1.0] for i in range(8)]
+    assert embeddings.stats.requested == 16
@@ -0,0 +1,30 @@
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from extraction import available_backends, extract_page  # noqa: E402
+
+PAGES = sorted(glob.glob(os.path.join(ROOT, "benchmarks", "fixtures", "pages", "*.html")))
+
+
+@pytest.mark.parametrize("path", PAGES, ids=os.path.basename)
+def test_backends_extract_the_same_lines(path):
+    # Chunking and the minimum-length check must not depend on HTML_PARSER
+    with open(path, 'r', encoding='utf-8') as file:
+        html = file.read()
+    results = {backend: extract_page(html, backend) for backend in available_backends()}
+    contents = {backend: content for backend, (content, _) in results.items()}
+    assert len(set(contents.values())) == 1, {backend: len(content.splitlines()) for backend, content in contents.items()}
+    assert all(line.strip() for line in contents["bs4"].splitlines())
+
+
+@pytest.mark.parametrize("html", ["<!-- only a comment -->", "<html></html>", "   "])
+def test_empty_documents_are_empty_pages(html):
+    # Not a parse failure, which would keep the page's old chunks indexed
+    for backend in available_backends():
+        assert extract_page(html, backend) == ("", [])
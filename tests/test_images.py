@@ -0,0 +1,94 @@
+import io
+import ipaddress
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import images  # noqa: E402
+from images import ImageProxy, ThumbnailCache, is_public_url, resolve_image_urls  # noqa: E402
+
+
+def png_bytes():
+    from PIL import Image
+
+    output = io.BytesIO()
+    Image.new("RGB", (40, 40), "red").save(output, format="PNG")
+    return output.getvalue()
+
+
+def serve(address, port, handle):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            handle(self)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((address, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def test_literal_private_hosts_are_dropped_without_dns():
+    for url in ("http://127.0.0.1:9108/metrics", "http://localhost/a.jpg", "http://10.0.0.5/a.jpg",
+                "http://169.254.169.254/latest", "http://[::1]/a.jpg", "http://[::ffff:127.0.0.1]/a.jpg"):
+        assert not is_public_url(url), url
+    assert is_public_url("https://cdn.shopify.com/a.jpg")
+    assert resolve_image_urls("http://127.0.0.1:8000/p", ["/a.jpg", "https://cdn.shopify.com/b.jpg"]) == \
+        ["https://cdn.shopify.com/b.jpg"]
+
+
+def test_fetch_connects_to_the_checked_address(tmp_path, monkeypatch):
+    # rebind.test resolves to an "allowed" address for the check and to loopback afterwards; the proxy
+    # must connect to the address it checked. 127.0.0.2 stands in for a public address here.
+    body = png_bytes()
+    seen = {"image": [], "internal": []}
+
+    def image(handler):
+        seen["image"].append(handler.headers["Host"])
+        if handler.path == "/redirect.png":
+            handler.send_response(302)
+            handler.send_header("Location", f"http://127.0.0.1:{port}/metrics")
+            handler.end_headers()
+            return
+        handler.send_response(200)
+        handler.send_header("Content-Length", str(len(body)))
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def internal(handler):
+        seen["internal"].append(handler.path)
+        handler.send_response(200)
+        handler.end_headers()
+
+    public = serve("127.0.0.2", 0, image)
+    port = public.server_address[1]
+    loopback = serve("127.0.0.1", port, internal)
+
+    real_getaddrinfo = socket.getaddrinfo
+    lookups = []
+
+    def rebinding_getaddrinfo(host, *args, **kwargs):
+        if host == "rebind.test":
+            lookups.append(host)
+            host = "127.0.0.2" if len(lookups) == 1 else "127.0.0.1"
+        return real_getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", rebinding_getaddrinfo)
+    monkeypatch.setattr(images, "_is_public_address",
+                        lambda address: str(ipaddress.ip_address(address)) == "127.0.0.2")
+    proxy = ImageProxy(ThumbnailCache(str(tmp_path), 1024 * 1024), timeout=2)
+    try:
+        assert proxy.thumbnail(f"http://rebind.test:{port}/a.png") is not None
+        assert seen["image"] == [f"rebind.test:{port}"]
+        # The redirect points at a private address and is refused
+        assert proxy.thumbnail(f"http://127.0.0.2:{port}/redirect.png") is None
+        assert seen["internal"] == []
+    finally:
+        public.shutdown()
+        loopback.shutdown()
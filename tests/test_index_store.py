@@ -0,0 +1,48 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from index_store import IndexStore  # noqa: E402
+
+STATE = {"indexer": {"page_hashes": {}, "page_chunks": {}}}
+
+
+def test_new_generation_copies_the_base_snapshot(tmp_path):
+    store = IndexStore(str(tmp_path), "test-model")
+    generation, path = store.new_generation(None)
+    assert generation == 1
+    with open(os.path.join(path, "chroma.sqlite3"), 'w') as file:
+        file.write("data")
+    store.publish(generation, STATE)
+
+    generation, path = store.new_generation(1)
+    assert generation == 2
+    assert os.path.exists(os.path.join(path, "chroma.sqlite3"))
+    assert store.load()[0] == 1  # unpublished until publish()
+
+
+def test_new_generation_never_reuses_a_discarded_number(tmp_path):
+    store = IndexStore(str(tmp_path), "test-model")
+    store.new_generation(None)
+    store.publish(1, STATE)
+
+    failed, _ = store.new_generation(1)
+    store.discard(failed)
+    assert store.new_generation(1)[0] == failed + 1
+
+
+def test_new_generation_skips_numbers_of_a_previous_process(tmp_path):
+    store = IndexStore(str(tmp_path), "test-model")
+    store.new_generation(None)
+    store.publish(1, STATE)
+    store.new_generation(1)  # left behind by a crash, never published
+    store.prune(keep=[1, 2])
+
+    # A restarted process sees the leftover directory and the manifest
+    restarted = IndexStore(str(tmp_path), "test-model")
+    assert restarted.new_generation(1)[0] == 3
+    # Even once pruned, the last number handed out is not handed out again
+    restarted.prune(keep=[1])
+    assert restarted.new_generation(1)[0] == 4
@@ -0,0 +1,113 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter  # noqa: E402
+from langchain_core.documents import Document  # noqa: E402
+
+from indexer import IncrementalIndexer, IndexPlanner, chunk_id  # noqa: E402
+
+SHARED = "Embroidered lawn three piece suit with printed chiffon dupatta and dyed cambric trousers."
+KHAADI = "Khaadi unstitched collection: digital printed khaddar shirts in rust, olive and mustard."
+SAPPHIRE = "Sapphire ready to wear: cotton kurtas with mirror work necklines in teal and ivory."
+
+
+def page(url, *paragraphs):
+    return Document(page_content="\n\n".join(paragraphs), metadata={"source": url})
+
+
+def make_indexer():
+    splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=0)
+    return IncrementalIndexer(splitter, max_distance=3)
+
+
+def refresh(indexer, docs, keep_urls=()):
+    # One refresh cycle as FashionBot runs it: pages in order, then finish, then commit
+    planner = IndexPlanner(indexer)
+    added, removed = [], []
+    for doc in docs:
+        page_added, page_removed = planner.add(doc)
+        added.extend(cid for cid, _ in page_added)
+        removed.extend(page_removed)
+    page_added, page_removed = planner.finish(keep_urls)
+    added.extend(cid for cid, _ in page_added)
+    removed.extend(page_removed)
+    indexer.commit(planner.diff)
+    return added, removed, planner.diff
+
+
+def test_first_refresh_adds_every_chunk():
+    indexer = make_indexer()
+    added, removed, diff = refresh(indexer, [page("https://a.pk/1", KHAADI), page("https://b.pk/1", SAPPHIRE)])
+    assert added == [chunk_id("https://a.pk/1", KHAADI), chunk_id("https://b.pk/1", SAPPHIRE)]
+    assert removed == []
+    assert (diff.changed_pages, diff.unchanged_pages, diff.new_chunks) == (2, 0, 2)
+
+
+def test_unchanged_page_touches_nothing():
+    indexer = make_indexer()
+    refresh(indexer, [page("https://a.pk/1", KHAADI)])
+    added, removed, diff = refresh(indexer, [page("https://a.pk/1", KHAADI)])
+    assert (added, removed) == ([], [])
+    assert (diff.unchanged_pages, diff.changed_pages, diff.new_chunks) == (1, 0, 0)
+
+
+def test_changed_page_swaps_only_its_changed_chunks():
+    indexer = make_indexer()
+    refresh(indexer, [page("https://a.pk/1", KHAADI, SHARED)])
+    added, removed, diff = refresh(indexer, [page("https://a.pk/1", KHAADI, SAPPHIRE)])
+    assert added == [chunk_id("https://a.pk/1", SAPPHIRE)]
+    assert removed == [chunk_id("https://a.pk/1", SHARED)]
+    assert diff.changed_pages == 1
+    assert indexer.page_chunks["https://a.pk/1"] == [chunk_id("https://a.pk/1", KHAADI),
+                                                     chunk_id("https://a.pk/1", SAPPHIRE)]
+
+
+def test_removed_page_drops_its_chunks():
+    indexer = make_indexer()
+    refresh(indexer, [page("https://a.pk/1", KHAADI), page("https://b.pk/1", SAPPHIRE)])
+    added, removed, diff = refresh(indexer, [page("https://a.pk/1", KHAADI)])
+    assert added == []
+    assert removed == [chunk_id("https://b.pk/1", SAPPHIRE)]
+    assert diff.removed_urls == ["https://b.pk/1"]
+    assert "https://b.pk/1" not in indexer.page_hashes
+
+
+def test_transiently_failed_page_keeps_its_chunks():
+    indexer = make_indexer()
+    refresh(indexer, [page("https://a.pk/1", KHAADI), page("https://b.pk/1", SAPPHIRE)])
+    added, removed, diff = refresh(indexer, [page("https://a.pk/1", KHAADI)], keep_urls={"https://b.pk/1"})
+    assert (added, removed) == ([], [])
+    assert diff.removed_pages == 0
+    assert indexer.page_chunks["https://b.pk/1"] == [chunk_id("https://b.pk/1", SAPPHIRE)]
+
+
+def test_duplicate_is_dropped_while_its_source_is_indexed():
+    indexer = make_indexer()
+    added, _, diff = refresh(indexer, [page("https://a.pk/1", SHARED), page("https://b.pk/1", SHARED, SAPPHIRE)])
+    assert added == [chunk_id("https://a.pk/1", SHARED), chunk_id("https://b.pk/1", SAPPHIRE)]
+    assert (diff.new_chunks, diff.duplicate_chunks) == (3, 1)
+    assert indexer.page_duplicates["https://b.pk/1"] == [chunk_id("https://a.pk/1", SHARED)]
+
+
+def test_duplicate_comes_back_when_its_source_page_disappears():
+    indexer = make_indexer()
+    refresh(indexer, [page("https://a.pk/1", SHARED), page("https://b.pk/1", SHARED, SAPPHIRE)])
+    # b.pk is unchanged, but the chunk its copy was dropped for leaves with a.pk
+    added, removed, diff = refresh(indexer, [page("https://b.pk/1", SHARED, SAPPHIRE)])
+    assert removed == [chunk_id("https://a.pk/1", SHARED)]
+    assert added == [chunk_id("https://b.pk/1", SHARED)]
+    assert (diff.unchanged_pages, diff.changed_pages) == (0, 1)
+    assert indexer.page_chunks["https://b.pk/1"] == [chunk_id("https://b.pk/1", SHARED),
+                                                     chunk_id("https://b.pk/1", SAPPHIRE)]
+    assert "https://b.pk/1" not in indexer.page_duplicates
+
+
+def test_duplicate_comes_back_when_its_source_chunk_changes():
+    indexer = make_indexer()
+    refresh(indexer, [page("https://a.pk/1", SHARED), page("https://b.pk/1", SHARED, SAPPHIRE)])
+    added, removed, _ = refresh(indexer, [page("https://a.pk/1", KHAADI), page("https://b.pk/1", SHARED, SAPPHIRE)])
+    assert removed == [chunk_id("https://a.pk/1", SHARED)]
+    assert sorted(added) == sorted([chunk_id("https://a.pk/1", KHAADI), chunk_id("https://b.pk/1", SHARED)])
@@ -0,0 +1,46 @@
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+import url_registry  # noqa: E402
+from url_registry import URLRegistry  # noqa: E402
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return condition()
+
+
+def test_reload_after_change_settles(tmp_path, monkeypatch):
+    loads = []
+    load_sites = url_registry.load_sites
+
+    def counting_load_sites(path):
+        loads.append(path)
+        return load_sites(path)
+
+    monkeypatch.setattr(url_registry, "load_sites", counting_load_sites)
+    urls_path = tmp_path / "urls.txt"
+    urls_path.write_text("https://www.khaadi.com\n")
+    registry = URLRegistry(str(urls_path), str(tmp_path / "scraped_urls.txt"))
+    try:
+        time.sleep(0.5)
+        idle = len(loads)
+        assert idle == 2  # one load of each file at start
+
+        with open(urls_path, 'a') as file:
+            file.write("https://nishatlinen.com\n")
+        assert wait_for(lambda: "https://nishatlinen.com" in registry.urls())
+        time.sleep(1.0)
+        settled = len(loads)
+        time.sleep(1.0)
+        # A write is a handful of events; the registry's own reads must not trigger more reloads
+        assert len(loads) == settled
+        assert settled - idle <= 10
+    finally:
+        registry.stop()
@@ -0,0 +1,100 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from bench_discovery import RESULTS_PAGE, start_stub_server  # noqa: E402
+from url_registry import URLRegistry  # noqa: E402
+from urls_finder import URLFinder, extract_result_urls, merge_urls, unwrap_result_link  # noqa: E402
+
+FIXTURE_SITES = [
+    "https://www.khaadi.com/pk/",
+    "https://www.sapphireonline.pk/collections/woman",
+    "https://www.gulahmedshop.com/women",
+    "https://www.alkaramstudio.com/",
+    "https://www.limelight.pk/",
+    "https://nishatlinen.com/",
+    "https://www.junaidjamshed.com/womens",
+    "https://bonanzasatrangi.com/",
+]
+
+
+def read_fixture():
+    with open(RESULTS_PAGE, 'r') as file:
+        return file.read()
+
+
+def test_unwrap_result_link():
+    assert unwrap_result_link("https://www.google.com/url?q=https://www.khaadi.com/pk/&sa=U") == \
+        "https://www.khaadi.com/pk/"
+    assert unwrap_result_link("https://duckduckgo.com/l/?uddg=https%3A%2F%2Fwww.limelight.pk%2F") == \
+        "https://www.limelight.pk/"
+    assert unwrap_result_link("https://r.search.yahoo.com/_ylt=A0/RU=https%3a%2f%2fnishatlinen.com%2f/RK=2/RS=x") == \
+        "https://nishatlinen.com/"
+    # Plain links, and wrappers whose parameter is not a URL, are returned unchanged
+    assert unwrap_result_link("https://bonanzasatrangi.com/") == "https://bonanzasatrangi.com/"
+    assert unwrap_result_link("https://www.google.com/search?q=lawn+suits") == \
+        "https://www.google.com/search?q=lawn+suits"
+
+
+def test_extract_result_urls_from_fixture():
+    urls = extract_result_urls(read_fixture(), "https://www.google.com/search?q=brands")
+    # Page order, one URL per domain, without engine, social and encyclopedia links
+    assert urls == FIXTURE_SITES
+
+
+def test_extract_result_urls_rejects_garbage():
+    assert extract_result_urls("", "https://www.google.com/search?q=brands") == []
+    assert extract_result_urls("<html><body>no links</body></html>", "https://www.google.com/search?q=x") == []
+
+
+def test_merge_urls(tmp_path):
+    path = str(tmp_path / "scraped_urls.txt")
+    with open(path, 'w') as file:
+        file.write("https://khaadi.com")  # no trailing newline
+
+    found = FIXTURE_SITES[:3] + ["not a url", "ftp://files.khaadi.com", "https://www.sapphireonline.pk/other"]
+    added = merge_urls(path, found)
+    # Site roots only, known domains (with or without www.) and duplicates skipped
+    assert added == ["https://www.sapphireonline.pk", "https://www.gulahmedshop.com"]
+    with open(path, 'r') as file:
+        assert file.read().splitlines() == ["https://khaadi.com", *added]
+
+    assert merge_urls(path, FIXTURE_SITES[:3]) == []
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_discover_merges_stub_results(tmp_path):
+    server = start_stub_server(0)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    output_path = str(tmp_path / "scraped_urls.txt")
+    url_finder = URLFinder(engines=[f"{base}/a/search?q=", f"{base}/b/search?q="], backend="http",
+                           output_path=output_path)
+    try:
+        urls = url_finder.discover(["lawn brands", "pret brands"])
+        assert urls == FIXTURE_SITES
+        # A second run finds the same sites and adds nothing
+        url_finder.discover(["lawn brands"])
+    finally:
+        url_finder.close()
+        server.shutdown()
+    with open(output_path, 'r') as file:
+        lines = file.read().splitlines()
+    assert len(lines) == len(FIXTURE_SITES)
+    assert lines[0] == "https://www.khaadi.com"
+
+
+def test_registry_scrapes_discovered_sites_only_when_enabled(tmp_path):
+    urls_path = tmp_path / "urls.txt"
+    urls_path.write_text("https://www.khaadi.com\n")
+    discovered_path = tmp_path / "scraped_urls.txt"
+    discovered_path.write_text("https://khaadi.com\nhttps://nishatlinen.com\n")
+
+    registry = URLRegistry(str(urls_path), str(discovered_path), include_discovered=False, watch=False)
+    assert registry.urls() == ["https://www.khaadi.com"]
+
+    registry = URLRegistry(str(urls_path), str(discovered_path), include_discovered=True, watch=False)
+    assert registry.urls() == ["https://www.khaadi.com", "https://nishatlinen.com"]
+    assert registry.search_urls("lawn") == ["https://www.khaadi.com/search?q=lawn"]